@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cybersecurity.settings')
 
+from cybersecurity.warmup import prewarm  # noqa: E402
+
 application = get_asgi_application()
+
+# Load the URLconf and DRF classes now rather than on the first request (API-only profile)
+prewarm()
@@ -0,0 +1,235 @@
+"""
+JWT authentication with a verified-token cache and a stateless service-account mode.
+
+`rest_framework_simplejwt.authentication.JWTAuthentication` verifies the token
+signature and loads the user from the database on every request. On the
+high-rate log ingest path the same handful of tokens arrive thousands of times,
+so this module keeps the result of a successful verification in a bounded LRU
+cache keyed by the SHA-256 of the raw token. Entries are dropped once the
+token's `exp` claim has passed or after `MAX_AGE` seconds, whichever comes
+first, so user deactivation and password changes are picked up within
+`MAX_AGE` even in other processes. Saving or deleting a user also drops that
+user's entries from the cache of the current process right away.
+
+Tokens carrying the service-account claim (see `JWT_AUTH_CACHE` in settings)
+resolve to a `TokenUser` built from the token payload, without any user query.
+They are meant for ingest clients such as `upload_data.py`. Their lifetime is
+capped by `SERVICE_ACCOUNT_MAX_DAYS`, and they can be revoked by listing their
+token id (`jti`) or account name in `REVOKED_SERVICE_ACCOUNTS`.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+# Defaults used when settings.JWT_AUTH_CACHE omits a key
+DEFAULT_CACHE_SETTINGS = {
+    'MAX_SIZE': 10000,
+    'MAX_AGE': 60,
+    'SERVICE_ACCOUNT_CLAIM': 'service_account',
+    'SERVICE_ACCOUNT_MAX_DAYS': 30,
+    'REVOKED_SERVICE_ACCOUNTS': [],
+}
+
+
+def get_cache_setting(name):
+    """
+    Returns a JWT auth cache setting, falling back to the module defaults.
+
+    Args:
+        name (str): Key inside settings.JWT_AUTH_CACHE.
+
+    Returns:
+        The configured value for the given key.
+    """
+    return getattr(settings, 'JWT_AUTH_CACHE', {}).get(name, DEFAULT_CACHE_SETTINGS[name])
+
+
+class VerifiedTokenCache:
+    """
+    Thread-safe LRU cache of verified tokens.
+
+    Each entry maps a token digest to `(expires, user, validated_token)`. Lookups
+    evict the entry if `expires` has passed; inserts evict the least recently
+    used entry once `max_size` is reached. Digests are also indexed by user
+    primary key so that `invalidate_user` can drop every token of a user.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached `(user, validated_token)` pair, or None on a miss or expired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._discard(key)  # Token expired (or reached MAX_AGE) since it was cached
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def set(self, key, expires, user, validated_token):
+        """
+        Stores a verified token until `expires` (epoch seconds).
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (expires, user, validated_token)
+            self._entries.move_to_end(key)
+            if user.pk is not None:
+                self._user_keys.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))  # Evict least recently used token
+
+    def invalidate_user(self, user_pk):
+        """
+        Drops every cached token of the user with primary key `user_pk`.
+        """
+        with self._lock:
+            for key in self._user_keys.pop(user_pk, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Drops every cached token, e.g. after rotating keys.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def _discard(self, key):
+        """
+        Removes one entry and its user index reference; the lock must be held.
+        """
+        user = self._entries.pop(key)[1]
+        keys = self._user_keys.get(user.pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user.pk]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Process-wide cache shared by all CachedJWTAuthentication instances
+token_cache = VerifiedTokenCache(get_cache_setting('MAX_SIZE'))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Forgets the cached tokens of a user whenever it is saved (deactivation, password change) or deleted.
+    """
+    token_cache.invalidate_user(instance.pk)
+
+
+def is_service_account_token(validated_token):
+    """
+    Checks whether a validated token was issued for a service account.
+    """
+    return bool(validated_token.get(get_cache_setting('SERVICE_ACCOUNT_CLAIM')))
+
+
+def issue_service_account_token(name, lifetime=None):
+    """
+    Creates a signed access token for a stateless service account.
+
+    Args:
+        name (str): Identifier of the ingest client, stored in the user id claim.
+        lifetime (timedelta, optional): Overrides the default access token lifetime.
+
+    Returns:
+        AccessToken: The token; use `str(token)` as the Bearer value. Its `jti` claim
+                     identifies it in `REVOKED_SERVICE_ACCOUNTS`.
+
+    Raises:
+        ValueError: If `lifetime` exceeds `SERVICE_ACCOUNT_MAX_DAYS`.
+    """
+    max_lifetime = timedelta(days=get_cache_setting('SERVICE_ACCOUNT_MAX_DAYS'))
+    if lifetime is not None and lifetime > max_lifetime:
+        raise ValueError(f"Service account tokens may not live longer than {max_lifetime.days} days")
+    token = AccessToken()
+    if lifetime is not None:
+        token.set_exp(lifetime=lifetime)
+    token[api_settings.USER_ID_CLAIM] = name
+    token[get_cache_setting('SERVICE_ACCOUNT_CLAIM')] = True
+    return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that skips signature verification and the user query for recently seen tokens.
+
+    A cache hit costs one SHA-256 and a dictionary lookup. Because the user is
+    cached along with the token, deactivating a user or changing their password
+    is seen immediately in the process that saved the user and within `MAX_AGE`
+    seconds everywhere else.
+    """
+
+    def authenticate(self, request):
+        """
+        Authenticates the request from its Bearer token, consulting the cache first.
+
+        Returns:
+            tuple | None: `(user, validated_token)`, or None if no JWT was supplied.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        key = hashlib.sha256(raw_token).hexdigest()
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Cache miss: verify the token and resolve its user the regular way
+        validated_token = self.get_validated_token(raw_token)
+        user = self.get_user(validated_token)
+
+        exp = validated_token.get('exp')
+        if exp is not None:
+            token_cache.set(key, min(exp, time.time() + get_cache_setting('MAX_AGE')), user, validated_token)
+        return user, validated_token
+
+    def get_user(self, validated_token):
+        """
+        Returns a `TokenUser` for service-account tokens and a database user otherwise.
+
+        Raises:
+            InvalidToken: If a service-account token is revoked or outlives `SERVICE_ACCOUNT_MAX_DAYS`.
+        """
+        if is_service_account_token(validated_token):
+            revoked = get_cache_setting('REVOKED_SERVICE_ACCOUNTS')
+            if (validated_token.get(api_settings.JTI_CLAIM) in revoked
+                    or validated_token.get(api_settings.USER_ID_CLAIM) in revoked):
+                raise InvalidToken("Service account token has been revoked")
+            lifetime = validated_token.get('exp', 0) - validated_token.get('iat', 0)
+            if lifetime > timedelta(days=get_cache_setting('SERVICE_ACCOUNT_MAX_DAYS')).total_seconds():
+                raise InvalidToken("Service account token lifetime exceeds SERVICE_ACCOUNT_MAX_DAYS")
+            return TokenUser(validated_token)
+        return super().get_user(validated_token)
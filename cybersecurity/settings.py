@@ -93,10 +93,53 @@ DATABASES = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'cybersecurity.authentication.CachedJWTAuthentication',
     ),
 }
 
+# Verified-token cache used by CachedJWTAuthentication.
+# MAX_SIZE bounds the number of cached tokens (0 disables caching) and MAX_AGE the
+# seconds a verified token is trusted before its user is checked again;
+# tokens carrying SERVICE_ACCOUNT_CLAIM authenticate without a user query, may live at most
+# SERVICE_ACCOUNT_MAX_DAYS and are rejected when their jti or name is in REVOKED_SERVICE_ACCOUNTS.
+JWT_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'MAX_AGE': 60,
+    'SERVICE_ACCOUNT_CLAIM': 'service_account',
+    'SERVICE_ACCOUNT_MAX_DAYS': 30,
+    'REVOKED_SERVICE_ACCOUNTS': [],
+}
+
+# Optional offline IP-range database used to tag ingested logs with country/ASN.
+# CSV with header start_ip,end_ip,country,asn,as_org; None disables enrichment.
+IP_ENRICHMENT_DATABASE = None
+
+# Run the statistical anomaly engine (threat_analyzer.anomaly_detection) on every
+# analyzed upload, in addition to the rule-based detection. Off by default because it
+# adds new threat types to the analyze response and stores per-user baselines.
+ANOMALY_DETECTION_ENABLED = False
+
+# Threats with the same user, type and IP closer than this are merged into one incident.
+INCIDENT_CORRELATION_GAP_SECONDS = 900
+
+# Store every raw Threat row in addition to incidents; disable to keep only incidents.
+STORE_RAW_THREATS = True
+
+# Allow callers of /api/threats/analyze to request a profiling report with the
+# "X-Profile: 1" header or "?profile=1" ("cprofile" also dumps a pstats file
+# into ANALYZE_PROFILING_DIR and is rejected while it is None).
+ANALYZE_PROFILING_ENABLED = DEBUG
+ANALYZE_PROFILING_DIR = None
+
+# Retention policy applied by "python manage.py compact_retention" (days; None keeps rows forever)
+# and the directory receiving archives of removed rows (None deletes without archiving).
+RETENTION_DAYS = {
+    'logs': 90,
+    'threats': 365,
+    'incidents': 365,
+}
+RETENTION_ARCHIVE_DIR = None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -0,0 +1,48 @@
+"""
+API-only Django settings for the cybersecurity project.
+
+The project only serves the JWT-protected JSON APIs of `log_ingestor` and
+`threat_analyzer`. This profile keeps everything from `settings` but drops the
+apps and middleware those APIs never use (admin, sessions, messages,
+staticfiles, CSRF/session/message middleware, the browsable API), which
+shortens cold start and the per-request middleware chain.
+
+Usage:
+    DJANGO_SETTINGS_MODULE=cybersecurity.settings_api gunicorn cybersecurity.wsgi
+    python manage.py benchmark_startup
+"""
+
+from cybersecurity.settings import *  # noqa: F401,F403
+
+# auth and contenttypes back the User model used by JWT authentication.
+# django_elasticsearch_dsl is left out: no document is registered and it costs ~0.4s to import.
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'log_ingestor',
+    'threat_analyzer',
+    'rest_framework',
+]
+
+# JWT authentication happens in DRF, so the session, CSRF and message layers are not needed
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+# Same routes as cybersecurity.urls, without the admin site
+ROOT_URLCONF = 'cybersecurity.urls_api'
+
+# JSON in and out only: no browsable API, hence no templates
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,  # noqa: F405
+    'DEFAULT_RENDERER_CLASSES': (
+        'rest_framework.renderers.JSONRenderer',
+    ),
+}
+
+# Resolve every route and load the DRF classes when the WSGI/ASGI application is created
+# (see cybersecurity.warmup) instead of on the first request of each worker.
+PREWARM_URLCONF = True
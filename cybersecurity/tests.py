@@ -0,0 +1,136 @@
+"""
+Tests for the cached JWT authentication and the API-only settings profile.
+"""
+
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from cybersecurity import settings_api
+from cybersecurity.authentication import (
+    CachedJWTAuthentication,
+    VerifiedTokenCache,
+    issue_service_account_token,
+    token_cache,
+)
+from cybersecurity.warmup import prewarm
+
+# Settings that make up the API-only profile (its INSTALLED_APPS cannot be swapped inside a test)
+API_PROFILE = {name: getattr(settings_api, name)
+               for name in ['MIDDLEWARE', 'ROOT_URLCONF', 'TEMPLATES', 'REST_FRAMEWORK', 'PREWARM_URLCONF']}
+
+
+def bearer_request(token):
+    return APIRequestFactory().post('/api/logs', {}, format='json', HTTP_AUTHORIZATION=f"Bearer {token}")
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.authenticator = CachedJWTAuthentication()
+        self.user = get_user_model().objects.create_user(username='analyst', password='secret')
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_cached_user_token_is_dropped_when_user_is_deactivated(self):
+        token = str(AccessToken.for_user(self.user))
+        self.assertEqual(self.authenticator.authenticate(bearer_request(token))[0], self.user)
+        self.assertEqual(len(token_cache), 1)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(len(token_cache), 0)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticator.authenticate(bearer_request(token))
+
+    def test_cache_entry_expires_after_max_age(self):
+        token = str(AccessToken.for_user(self.user))
+        # Deactivate without save() signals: only the MAX_AGE expiry can reveal the change
+        deactivate = get_user_model().objects.filter(pk=self.user.pk).update
+        with override_settings(JWT_AUTH_CACHE={'MAX_AGE': 0}):
+            self.authenticator.authenticate(bearer_request(token))
+            deactivate(is_active=False)
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticator.authenticate(bearer_request(token))
+
+    def test_cache_without_max_age_keeps_serving_the_token(self):
+        token = str(AccessToken.for_user(self.user))
+        self.authenticator.authenticate(bearer_request(token))
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.authenticator.authenticate(bearer_request(token))[0], self.user)
+
+    def test_cache_is_bounded_and_evicts_least_recently_used(self):
+        cache = VerifiedTokenCache(max_size=2)
+        expires = time.time() + 60
+        for key in ("a", "b"):
+            cache.set(key, expires, self.user, key)
+        self.assertIsNotNone(cache.get("a"))  # "b" is now the least recently used entry
+
+        cache.set("c", expires, self.user, "c")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), (self.user, "a"))
+        self.assertEqual(cache.get("c"), (self.user, "c"))
+
+        cache.invalidate_user(self.user.pk)
+        self.assertEqual(len(cache), 0)
+
+    def test_service_token_lifetime_is_capped(self):
+        with override_settings(JWT_AUTH_CACHE={'SERVICE_ACCOUNT_MAX_DAYS': 7}):
+            with self.assertRaises(ValueError):
+                issue_service_account_token('uploader', lifetime=timedelta(days=8))
+
+            token = AccessToken()
+            token.set_exp(lifetime=timedelta(days=8))
+            token['user_id'] = 'uploader'
+            token['service_account'] = True
+            with self.assertRaises(InvalidToken):
+                self.authenticator.authenticate(bearer_request(str(token)))
+
+    def test_revoked_service_token_is_rejected(self):
+        token = issue_service_account_token('uploader')
+        user, _ = self.authenticator.authenticate(bearer_request(str(token)))
+        self.assertEqual(user.id, 'uploader')
+
+        token_cache.clear()
+        with override_settings(JWT_AUTH_CACHE={'REVOKED_SERVICE_ACCOUNTS': [token['jti']]}):
+            with self.assertRaises(InvalidToken):
+                self.authenticator.authenticate(bearer_request(str(token)))
+
+
+@override_settings(**API_PROFILE)
+class APIProfileTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        user = get_user_model().objects.create_user(username='analyst', password='secret')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+    def test_prewarm_runs_only_when_enabled(self):
+        self.assertTrue(prewarm())
+        with override_settings(PREWARM_URLCONF=False):
+            self.assertFalse(prewarm())
+
+    def test_api_endpoints(self):
+        response = self.client.post('/api/logs', {'user_id': '42', 'ip_address': '10.0.0.1',
+                                                  'action': 'login_success'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.client.get('/api/logs').json()), 1)
+        self.assertEqual(self.client.post('/api/logs/search', {'userId': '42'}, format='json').status_code, 200)
+
+        upload = SimpleUploadedFile('logs.csv', b"timestamp,user_id,ip_address,action,file_name,database_query\n"
+                                                b"2025-03-26 03:00:00,42,10.0.0.1,file_access,/secure/payroll.csv,\n")
+        response = self.client.post('/api/threats/analyze', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['Total no of Threats detected'], 1)
+        self.assertEqual(self.client.get('/api/incidents').status_code, 200)
+
+        self.assertEqual(self.client.get('/admin/').status_code, 404)  # No admin site in this profile
@@ -0,0 +1,12 @@
+"""
+URL configuration used by the API-only settings profile (`cybersecurity.settings_api`).
+
+Routes the same JSON APIs as `cybersecurity.urls`, without the admin site.
+"""
+
+from django.urls import include, path
+
+urlpatterns = [
+    path('', include('log_ingestor.urls')),
+    path('', include('threat_analyzer.urls')),
+]
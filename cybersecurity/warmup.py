@@ -0,0 +1,44 @@
+"""
+Start-up warm-up of the URL resolver and the DRF request path.
+
+Django builds the URL resolver, compiles the route regexes and imports the
+views on the first request each worker serves, and DRF imports its default
+authentication, parser and renderer classes lazily too. With
+`PREWARM_URLCONF` enabled, `prewarm` does this work while the WSGI/ASGI
+application is created, so the first request does not pay for it.
+"""
+
+from django.conf import settings
+from django.urls import get_resolver
+
+# DRF settings whose classes are imported on first access
+PREWARMED_API_SETTINGS = [
+    'DEFAULT_AUTHENTICATION_CLASSES',
+    'DEFAULT_PERMISSION_CLASSES',
+    'DEFAULT_THROTTLE_CLASSES',
+    'DEFAULT_PARSER_CLASSES',
+    'DEFAULT_RENDERER_CLASSES',
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+    'DEFAULT_VERSIONING_CLASS',
+    'EXCEPTION_HANDLER',
+]
+
+
+def prewarm():
+    """
+    Loads the URLconf and DRF defaults if settings.PREWARM_URLCONF is set.
+
+    Returns:
+        bool: Whether anything was warmed up.
+    """
+    if not getattr(settings, 'PREWARM_URLCONF', False):
+        return False
+
+    from rest_framework.settings import api_settings  # Read only once Django is configured
+
+    resolver = get_resolver()
+    resolver.url_patterns  # Imports the URLconf and, through it, every view
+    resolver.reverse_dict  # Walks all patterns, compiling their regexes
+    for name in PREWARMED_API_SETTINGS:
+        getattr(api_settings, name)
+    return True
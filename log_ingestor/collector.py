@@ -0,0 +1,308 @@
+"""
+Building blocks of the `collect_logs` management command.
+
+The collector feeds the Log table directly, without going through HTTP:
+
+- `FileTailer` follows a growing log file, survives rotation (the path is
+  re-opened when its inode changes) and truncation, and exposes a byte offset
+  that is checkpointed once the lines before it are stored.
+- `LineServer` listens on a UDP or TCP socket for line-delimited JSON records.
+- `RecordValidator` applies the `LogSerializer` field rules and its `validate`
+  hook to each record, using one serializer instance for every record.
+- `LogBatcher` buffers validated records and writes them with `bulk_create`.
+"""
+
+import csv
+import json
+import os
+import queue
+import socketserver
+import threading
+
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+
+from .models import Log
+from .serializers import LogSerializer
+
+# Column order of CSV log files such as raw_logs_input.csv
+CSV_FIELDS = ["timestamp", "user_id", "ip_address", "action", "file_name", "database_query"]
+
+
+def parse_line(line, line_format="json"):
+    """
+    Parses one log line into a record dictionary.
+
+    Args:
+        line (str): A line without its trailing newline.
+        line_format (str): "json" for one JSON object per line, "csv" for CSV_FIELDS columns.
+
+    Returns:
+        dict | None: The record, or None for blank lines and CSV header lines.
+
+    Raises:
+        ValueError: If the line cannot be parsed.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line_format == "csv":
+        values = next(csv.reader([line]))
+        if values == CSV_FIELDS:
+            return None  # Header line, repeated at the top of every rotated file
+        return dict(zip(CSV_FIELDS, values))
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("Log record must be a JSON object")
+    return record
+
+
+class RecordValidator:
+    """
+    Validates raw records with the same field rules as `LogSerializer`.
+
+    This mirrors `Serializer.to_internal_value` followed by `Serializer.validate`,
+    but reuses a single serializer and its bound fields for every record instead
+    of building a serializer per log.
+    """
+
+    def __init__(self):
+        self.serializer = LogSerializer()
+        self.fields = [field for field in self.serializer.fields.values() if not field.read_only]
+
+    def validate(self, record):
+        """
+        Validates a record and returns the attributes for a `Log` instance.
+
+        Raises:
+            serializers.ValidationError: If any field is invalid.
+        """
+        attrs = {}
+        errors = {}
+        for field in self.fields:
+            try:
+                attrs[field.source] = field.run_validation(field.get_value(record))
+            except serializers.ValidationError as exc:
+                errors[field.field_name] = exc.detail
+            except SkipField:
+                pass
+        if errors:
+            raise serializers.ValidationError(errors)
+        return self.serializer.validate(attrs)
+
+
+class LogBatcher:
+    """
+    Buffers validated records and inserts them with `Log.objects.bulk_create`.
+    """
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.validator = RecordValidator()
+        self.pending = []
+        self.stored = 0
+        self.rejected = 0
+
+    def add(self, record):
+        """
+        Validates a record and queues it for insertion.
+
+        Returns:
+            bool: True when the batch is full and should be flushed.
+        """
+        try:
+            self.pending.append(Log(**self.validator.validate(record)))
+        except serializers.ValidationError:
+            self.rejected += 1
+        return len(self.pending) >= self.batch_size
+
+    def flush(self):
+        """
+        Inserts the queued logs.
+
+        Returns:
+            int: Number of logs written.
+        """
+        if not self.pending:
+            return 0
+        Log.objects.bulk_create(self.pending, batch_size=self.batch_size)
+        written = len(self.pending)
+        self.stored += written
+        self.pending = []
+        return written
+
+
+class FileTailer:
+    """
+    Follows a growing file line by line, handling rotation and truncation.
+
+    Attributes:
+        path (str): The followed path.
+        inode (int | None): Inode of the open file.
+        offset (int): Byte offset just after the last complete line returned.
+    """
+
+    def __init__(self, path, inode=None, offset=0, from_end=False):
+        self.path = path
+        self.inode = inode
+        self.offset = offset
+        self.from_end = from_end
+        self.handle = None
+
+    def _open(self):
+        """
+        Opens the path, resuming from the checkpointed offset if it is still the same file.
+        """
+        try:
+            handle = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(handle.fileno())
+        if stat.st_ino != self.inode:
+            # A different file than the checkpoint refers to: start from its beginning (or end)
+            self.offset = stat.st_size if self.from_end else 0
+            self.inode = stat.st_ino
+        elif stat.st_size < self.offset:
+            self.offset = 0  # Truncated since the checkpoint was written
+        handle.seek(self.offset)
+        self.handle = handle
+        return True
+
+    def _read_complete_lines(self):
+        """
+        Yields the complete lines available in the open file, advancing the offset past each.
+        """
+        while True:
+            line = self.handle.readline()
+            if not line:
+                return
+            if not line.endswith(b"\n"):
+                self.handle.seek(self.offset)  # Partial line: wait for the writer to finish it
+                return
+            self.offset += len(line)
+            yield line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    def read_lines(self):
+        """
+        Yields every new complete line, switching to the new file after a rotation.
+        """
+        if self.handle is None and not self._open():
+            return
+
+        yield from self._read_complete_lines()
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return  # Rotated away and not recreated yet; keep the old handle
+        if stat.st_ino != self.inode:
+            # Rotated: the old file is fully drained above, continue with the new one
+            self.close()
+            self.inode = None
+            self.from_end = False
+            if self._open():
+                yield from self._read_complete_lines()
+        elif stat.st_size < self.offset:
+            # Truncated in place (copytruncate)
+            self.offset = 0
+            self.handle.seek(0)
+            yield from self._read_complete_lines()
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+
+class _UDPHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data = self.request[0]
+        for line in data.decode("utf-8", errors="replace").splitlines():
+            self.server.lines.put(line)
+
+
+class _TCPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            self.server.lines.put(line.decode("utf-8", errors="replace"))
+
+
+class _ThreadingUDPServer(socketserver.ThreadingMixIn, socketserver.UDPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LineServer:
+    """
+    Background UDP or TCP listener pushing received lines onto a shared queue.
+    """
+
+    def __init__(self, protocol, address, lines):
+        """
+        Args:
+            protocol (str): "udp" or "tcp".
+            address (tuple): `(host, port)` to bind.
+            lines (queue.Queue): Queue receiving one item per line.
+        """
+        server_class, handler = {
+            "udp": (_ThreadingUDPServer, _UDPHandler),
+            "tcp": (_ThreadingTCPServer, _TCPHandler),
+        }[protocol]
+        self.server = server_class(address, handler)
+        self.server.lines = lines
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def load_checkpoint(path):
+    """
+    Reads the `{path: {"inode": int, "offset": int}}` checkpoint file, if any.
+    """
+    try:
+        with open(path) as checkpoint:
+            return json.load(checkpoint)
+    except FileNotFoundError:
+        return {}
+
+
+def save_checkpoint(path, tailers):
+    """
+    Atomically writes the offsets of the given tailers to the checkpoint file.
+
+    Offsets are merged into the stored checkpoint, so entries of files that
+    this run does not follow are kept for the next run that does.
+    """
+    data = load_checkpoint(path)
+    data.update({tailer.path: {"inode": tailer.inode, "offset": tailer.offset} for tailer in tailers})
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as checkpoint:
+        json.dump(data, checkpoint)
+    os.replace(tmp_path, path)
+
+
+def drain(lines, limit):
+    """
+    Returns up to `limit` lines already waiting in a queue, without blocking.
+    """
+    items = []
+    while len(items) < limit:
+        try:
+            items.append(lines.get_nowait())
+        except queue.Empty:
+            break
+    return items
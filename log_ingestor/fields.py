@@ -0,0 +1,39 @@
+"""
+Custom model fields shared by the log_ingestor and threat_analyzer apps.
+"""
+
+from django.db import models
+
+from .iputils import IP_KEY_LENGTH, ip_key
+
+
+class IPKeyField(models.CharField):
+    """
+    Indexed, sortable encoding of another model field holding an IP address.
+
+    The value is derived in `pre_save`, which Django calls for both `save()` and
+    `bulk_create()`, so it never has to be set by hand. `QuerySet.update()` does
+    not call `pre_save`; code updating the source field that way must update
+    this column too.
+    """
+
+    description = "Integer value of an IP address as zero-padded hex digits"
+
+    def __init__(self, *args, source='ip_address', **kwargs):
+        self.source = source
+        kwargs.setdefault('max_length', IP_KEY_LENGTH)
+        kwargs.setdefault('null', True)
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('db_index', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.source != 'ip_address':
+            kwargs['source'] = self.source
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = ip_key(getattr(model_instance, self.source))
+        setattr(model_instance, self.attname, value)
+        return value
@@ -0,0 +1,178 @@
+"""
+IP address encoding, CIDR/range filters and offline IP-range enrichment.
+
+IP addresses are stored alongside their integer value in an indexed `ip_key`
+column so that CIDR and range queries become B-tree range scans. Both IPv4 and
+IPv6 are supported: IPv4 addresses are mapped into `::ffff:0:0/96` and the
+128-bit integer is written as 32 zero-padded hex digits, which sort exactly
+like the integers themselves (a 128-bit value does not fit a BIGINT column).
+
+`IPRangeIndex` tags addresses with country/ASN data from a local CSV file of
+non-overlapping ranges, using a sorted list of range starts and `bisect`, so
+enrichment costs one binary search per log and no database query.
+"""
+
+import csv
+import ipaddress
+from bisect import bisect_right
+
+from django.conf import settings
+from django.db.models import Q
+
+# Width of the hex encoding of a 128-bit address
+IP_KEY_LENGTH = 32
+
+# Offset that maps IPv4 addresses into ::ffff:0:0/96
+IPV4_MAPPED_PREFIX = 0xFFFF << 32
+
+
+def ip_to_int(address):
+    """
+    Converts an IPv4 or IPv6 address to its 128-bit integer value.
+
+    Args:
+        address (str | IPv4Address | IPv6Address): The address to convert.
+
+    Returns:
+        int: The address value, with IPv4 mapped into ::ffff:0:0/96.
+
+    Raises:
+        ValueError: If `address` is not a valid IP address.
+    """
+    ip = ipaddress.ip_address(address)
+    if ip.version == 4:
+        return IPV4_MAPPED_PREFIX | int(ip)
+    return int(ip)
+
+
+def int_to_key(value):
+    """
+    Encodes a 128-bit integer as the sortable string stored in `ip_key` columns.
+    """
+    return format(value, f'0{IP_KEY_LENGTH}x')
+
+
+def ip_key(address):
+    """
+    Returns the `ip_key` value of an address, or None if it is empty or invalid.
+    """
+    if not address or not isinstance(address, str):
+        return None
+    try:
+        return int_to_key(ip_to_int(address.strip()))
+    except ValueError:
+        return None
+
+
+def network_filter(network):
+    """
+    Builds a filter matching IP addresses inside a CIDR block.
+
+    Args:
+        network (str): A CIDR block such as "10.0.0.0/8", or a single address.
+
+    Returns:
+        Q: Range filter on the `ip_key` column.
+
+    Raises:
+        ValueError: If `network` is not a valid CIDR block.
+    """
+    net = ipaddress.ip_network(network, strict=False)
+    first, last = ip_to_int(net.network_address), ip_to_int(net.broadcast_address)
+    return Q(ip_key__gte=int_to_key(first), ip_key__lte=int_to_key(last))
+
+
+def range_filter(start=None, end=None):
+    """
+    Builds a filter matching IP addresses between `start` and `end` (inclusive).
+
+    Args:
+        start (str, optional): Lowest address of the range.
+        end (str, optional): Highest address of the range.
+
+    Returns:
+        Q: Range filter on the `ip_key` column.
+
+    Raises:
+        ValueError: If either bound is not a valid IP address.
+    """
+    filters = Q()
+    if start:
+        filters &= Q(ip_key__gte=int_to_key(ip_to_int(start)))
+    if end:
+        filters &= Q(ip_key__lte=int_to_key(ip_to_int(end)))
+    return filters
+
+
+class IPRangeIndex:
+    """
+    In-memory interval index over non-overlapping IP ranges.
+
+    The source is a CSV file with the header `start_ip,end_ip,country,asn,as_org`.
+    Ranges are sorted by start address once at load time; a lookup is a
+    `bisect_right` over the starts followed by a bounds check on the end.
+    """
+
+    def __init__(self, ranges):
+        """
+        Args:
+            ranges (Iterable[tuple]): `(start_int, end_int, tags)` where `tags` is a dict of Log fields.
+        """
+        ranges = sorted(ranges, key=lambda r: r[0])
+        self.starts = [r[0] for r in ranges]
+        self.ends = [r[1] for r in ranges]
+        self.tags = [r[2] for r in ranges]
+
+    @classmethod
+    def from_csv(cls, path):
+        """
+        Loads the index from a local IP-range CSV file.
+        """
+        ranges = []
+        with open(path, newline='') as csvfile:
+            for row in csv.DictReader(csvfile):
+                tags = {
+                    'country': row.get('country') or None,
+                    'asn': int(row['asn']) if row.get('asn') else None,
+                    'as_org': row.get('as_org') or None,
+                }
+                ranges.append((ip_to_int(row['start_ip']), ip_to_int(row['end_ip']), tags))
+        return cls(ranges)
+
+    def lookup(self, address):
+        """
+        Returns the enrichment tags of the range containing `address`, or None.
+        """
+        try:
+            value = ip_to_int(address)
+        except ValueError:
+            return None
+        i = bisect_right(self.starts, value) - 1
+        if i >= 0 and value <= self.ends[i]:
+            return self.tags[i]
+        return None
+
+    def __len__(self):
+        return len(self.starts)
+
+
+# Loaded enrichment indexes, keyed by source path
+_enrichment_indexes = {}
+
+
+def get_enrichment_index():
+    """
+    Returns the enrichment index configured by settings.IP_ENRICHMENT_DATABASE.
+
+    The file is parsed on first use and kept in memory for the life of the process.
+
+    Returns:
+        IPRangeIndex | None: The index, or None when enrichment is disabled.
+    """
+    path = getattr(settings, 'IP_ENRICHMENT_DATABASE', None)
+    if not path:
+        return None
+    path = str(path)
+    if path not in _enrichment_indexes:
+        _enrichment_indexes[path] = IPRangeIndex.from_csv(path)
+    return _enrichment_indexes[path]
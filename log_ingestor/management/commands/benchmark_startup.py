@@ -0,0 +1,157 @@
+"""
+Management command that measures cold start and per-request overhead of the ingest endpoint.
+
+Every settings profile is benchmarked in fresh Python processes. Each process
+creates the WSGI application (as a server worker would), then sends one log
+to POST /api/logs through it, followed by `--iterations` more. The logs are
+written inside a transaction that is rolled back, and requests authenticate
+with a service-account token so no user has to exist.
+
+Usage:
+    python manage.py benchmark_startup
+    python manage.py benchmark_startup --runs 10 --iterations 2000
+    python manage.py benchmark_startup --profiles cybersecurity.settings,cybersecurity.settings_api
+"""
+
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Body of the benchmarked ingest request
+SAMPLE_LOG = {
+    "timestamp": "2025-03-26T00:04:00Z",
+    "user_id": "benchmark-user",
+    "ip_address": "192.168.1.10",
+    "action": "file_access",
+    "file_name": "/reports/q1.pdf",
+    "database_query": "",
+}
+
+# Entry point of the measured processes; the clock starts before Django is imported
+CHILD_SCRIPT = (
+    "import time; started = time.perf_counter(); "
+    "from log_ingestor.management.commands.benchmark_startup import run_child; "
+    "run_child(started, {iterations})"
+)
+
+
+def ingest_environ(body, token):
+    """
+    Builds the WSGI environ of a POST /api/logs request.
+    """
+    return {
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': '/api/logs',
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'HTTP_AUTHORIZATION': f"Bearer {token}",
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+
+def run_child(started, iterations):
+    """
+    Runs inside a fresh process: times application start-up, the first request and later requests.
+
+    Prints one JSON line with the measurements (seconds).
+    """
+    from cybersecurity.wsgi import application
+    ready = time.perf_counter() - started
+
+    from django.core import signals
+    from django.db import close_old_connections, transaction
+
+    # Connections are closed at the end of each request; keep the benchmark transaction open instead
+    signals.request_started.disconnect(close_old_connections)
+    signals.request_finished.disconnect(close_old_connections)
+
+    body = json.dumps(SAMPLE_LOG).encode()
+    token = os.environ['BENCHMARK_TOKEN']
+    statuses = set()
+
+    def send():
+        response = application(ingest_environ(body, token), lambda status, headers: statuses.add(status))
+        b"".join(response)
+        response.close()
+
+    with transaction.atomic():
+        first = time.perf_counter()
+        send()
+        first = time.perf_counter() - first
+
+        loop = time.perf_counter()
+        for _ in range(iterations):
+            send()
+        per_request = (time.perf_counter() - loop) / iterations if iterations else 0.0
+        transaction.set_rollback(True)  # Leave no benchmark logs behind
+
+    print(json.dumps({"ready": ready, "first_request": first, "per_request": per_request,
+                      "modules": len(sys.modules), "statuses": sorted(statuses)}))
+
+
+class Command(BaseCommand):
+    """
+    Compares settings profiles on cold start, first request and steady-state request time.
+    """
+
+    help = "Benchmark cold start and per-request overhead of POST /api/logs for each settings profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='cybersecurity.settings,cybersecurity.settings_api',
+                            help="Comma-separated settings modules to compare.")
+        parser.add_argument('--runs', type=int, default=5, help="Cold starts per profile (the median is reported).")
+        parser.add_argument('--iterations', type=int, default=500, help="Requests timed after the first one.")
+
+    def handle(self, *args, **options):
+        # Imported here: this module is also the entry point of the measured processes
+        from cybersecurity.authentication import issue_service_account_token
+
+        token = str(issue_service_account_token('benchmark-startup'))
+
+        self.stdout.write(f"{'profile':<34} {'process':>10} {'ready':>10} {'1st req':>10} "
+                          f"{'per req':>10} {'modules':>8}")
+        for profile in options['profiles'].split(','):
+            runs = [self.run_profile(profile.strip(), token, options['iterations']) for _ in range(options['runs'])]
+            median = {key: statistics.median(run[key] for run in runs)
+                      for key in ("process", "ready", "first_request", "per_request", "modules")}
+            self.stdout.write(
+                f"{profile:<34} {median['process'] * 1000:8.1f}ms {median['ready'] * 1000:8.1f}ms "
+                f"{median['first_request'] * 1000:8.1f}ms {median['per_request'] * 1e6:8.0f}us "
+                f"{median['modules']:8.0f}"
+            )
+
+    def run_profile(self, profile, token, iterations):
+        """
+        Benchmarks one settings module in a new process and returns its measurements.
+        """
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile, BENCHMARK_TOKEN=token)
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', CHILD_SCRIPT.format(iterations=iterations)],
+                                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            raise CommandError(f"{profile} failed:\n{result.stderr}")
+
+        measurements = json.loads(result.stdout.strip().splitlines()[-1])
+        if measurements["statuses"] != ["201 Created"]:
+            raise CommandError(f"{profile}: unexpected responses {measurements['statuses']}")
+        measurements["process"] = elapsed
+        return measurements
@@ -0,0 +1,172 @@
+"""
+Management command that collects logs from files and sockets straight into the Log table.
+
+Usage:
+    python manage.py collect_logs /var/log/app/activity.log --format json
+    python manage.py collect_logs raw_logs_input.csv --format csv --once
+    python manage.py collect_logs --udp 127.0.0.1:5140 --tcp 127.0.0.1:5140
+"""
+
+import queue
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from log_ingestor.collector import (
+    FileTailer,
+    LineServer,
+    LogBatcher,
+    drain,
+    load_checkpoint,
+    parse_line,
+    save_checkpoint,
+)
+
+
+def parse_address(value):
+    """
+    Parses a "host:port" option value into a `(host, port)` tuple.
+    """
+    host, _, port = value.rpartition(":")
+    if not port.isdigit():
+        raise CommandError(f"Invalid address '{value}', expected host:port")
+    return host or "127.0.0.1", int(port)
+
+
+class Command(BaseCommand):
+    """
+    Tails log files and listens on UDP/TCP sockets, storing records with `bulk_create`.
+
+    File lines use `--format` (JSON objects or CSV rows); socket input is always
+    line-delimited JSON. Every record is validated with the `LogSerializer` rules.
+    File offsets are checkpointed after each flush, so a restart resumes where
+    the last stored batch ended.
+    """
+
+    help = "Tail log files and listen on UDP/TCP sockets, inserting logs in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help="Log files to follow.")
+        parser.add_argument('--format', choices=['json', 'csv'], default='json', dest='line_format',
+                            help="Format of file lines (sockets always receive JSON lines).")
+        parser.add_argument('--checkpoint', default='collector_checkpoint.json',
+                            help="File storing the offset reached in each followed file.")
+        parser.add_argument('--from-end', action='store_true',
+                            help="Skip existing content of files that have no checkpoint.")
+        parser.add_argument('--udp', help="host:port to receive JSON lines over UDP.")
+        parser.add_argument('--tcp', help="host:port to receive JSON lines over TCP.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Logs per bulk insert.")
+        parser.add_argument('--flush-interval', type=float, default=1.0,
+                            help="Maximum seconds a received log waits before being inserted.")
+        parser.add_argument('--poll-interval', type=float, default=0.2,
+                            help="Seconds to sleep when no new input is available.")
+        parser.add_argument('--once', action='store_true',
+                            help="Read the files to their current end, flush and exit.")
+
+    def handle(self, *args, **options):
+        if not options['paths'] and not (options['udp'] or options['tcp']):
+            raise CommandError("Give at least one file path, --udp or --tcp.")
+        if options['once'] and (options['udp'] or options['tcp']):
+            raise CommandError("--once only applies to files.")
+
+        checkpoint = load_checkpoint(options['checkpoint'])
+        tailers = [
+            FileTailer(path, from_end=options['from_end'], **checkpoint.get(path, {}))
+            for path in options['paths']
+        ]
+
+        lines = queue.Queue()
+        servers = []
+        for protocol in ('udp', 'tcp'):
+            if options[protocol]:
+                server = LineServer(protocol, parse_address(options[protocol]), lines)
+                server.start()
+                servers.append(server)
+                self.stdout.write(f"Listening on {protocol}://{server.address[0]}:{server.address[1]}")
+
+        batcher = LogBatcher(batch_size=options['batch_size'])
+        # Stop between records rather than raising inside a flush, which could store a batch twice
+        self.stopping = False
+        previous_handlers = {signum: signal.signal(signum, self.request_stop)
+                             for signum in (signal.SIGTERM, signal.SIGINT)}
+        self.started = time.monotonic()
+        last_flush = time.monotonic()
+
+        try:
+            while not self.stopping:
+                received = 0
+
+                for tailer in tailers:
+                    for line in tailer.read_lines():
+                        received += 1
+                        if self.collect(batcher, line, options['line_format']):
+                            self.flush(batcher, tailers, options['checkpoint'])
+                            last_flush = time.monotonic()
+                        if self.stopping:
+                            break
+
+                for line in drain(lines, options['batch_size']):
+                    received += 1
+                    if self.collect(batcher, line, 'json'):
+                        self.flush(batcher, tailers, options['checkpoint'])
+                        last_flush = time.monotonic()
+
+                if options['once']:
+                    break
+                if time.monotonic() - last_flush >= options['flush_interval']:
+                    self.flush(batcher, tailers, options['checkpoint'])
+                    last_flush = time.monotonic()
+                if not received and not self.stopping:
+                    time.sleep(options['poll_interval'])
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+            for server in servers:
+                server.stop()
+            # Store what the sockets already received
+            for line in drain(lines, lines.qsize()):
+                if self.collect(batcher, line, 'json'):
+                    batcher.flush()
+            self.flush(batcher, tailers, options['checkpoint'])
+            for tailer in tailers:
+                tailer.close()
+
+        self.report(batcher)
+
+    def request_stop(self, signum, frame):
+        """
+        Signal handler for SIGTERM/SIGINT: the main loop exits after the current record.
+        """
+        self.stopping = True
+
+    def collect(self, batcher, line, line_format):
+        """
+        Parses and validates one line; returns True when the batch is full.
+        """
+        try:
+            record = parse_line(line, line_format)
+        except ValueError:
+            batcher.rejected += 1
+            return False
+        if record is None:
+            return False
+        return batcher.add(record)
+
+    def flush(self, batcher, tailers, checkpoint_path):
+        """
+        Inserts pending logs, then records the file offsets they were read up to.
+        """
+        batcher.flush()
+        if tailers:
+            save_checkpoint(checkpoint_path, tailers)
+
+    def report(self, batcher):
+        """
+        Prints the number of stored and rejected logs and the insert rate.
+        """
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        self.stdout.write(
+            f"Stored {batcher.stored} logs, rejected {batcher.rejected} "
+            f"({batcher.stored / elapsed:.0f} logs/sec)"
+        )
@@ -0,0 +1,39 @@
+"""
+Management command that issues a stateless service-account token for ingest clients.
+
+Usage:
+    python manage.py issue_service_token uploader --days 30
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cybersecurity.authentication import issue_service_account_token
+
+
+class Command(BaseCommand):
+    """
+    Prints a signed access token carrying the service-account claim.
+
+    Requests made with this token are authenticated by `CachedJWTAuthentication`
+    without looking up a user in the database. The token id is printed on stderr;
+    add it to `JWT_AUTH_CACHE['REVOKED_SERVICE_ACCOUNTS']` to revoke the token.
+    """
+
+    help = "Issue a stateless JWT access token for a log ingest service account."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help="Identifier of the ingest client (stored in the user id claim).")
+        parser.add_argument('--days', type=int, default=None,
+                            help="Token lifetime in days (defaults to ACCESS_TOKEN_LIFETIME, "
+                                 "at most SERVICE_ACCOUNT_MAX_DAYS).")
+
+    def handle(self, *args, **options):
+        lifetime = timedelta(days=options['days']) if options['days'] else None
+        try:
+            token = issue_service_account_token(options['name'], lifetime=lifetime)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stderr.write(f"Token id (jti): {token['jti']}")
+        self.stdout.write(str(token))
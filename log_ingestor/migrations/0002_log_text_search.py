@@ -0,0 +1,78 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS log_ingestor_log_fts USING fts5(
+        file_name, database_query,
+        content='log_ingestor_log', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS log_ingestor_log_fts_insert AFTER INSERT ON log_ingestor_log BEGIN
+        INSERT INTO log_ingestor_log_fts(rowid, file_name, database_query)
+        VALUES (new.id, new.file_name, new.database_query);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS log_ingestor_log_fts_delete AFTER DELETE ON log_ingestor_log BEGIN
+        INSERT INTO log_ingestor_log_fts(log_ingestor_log_fts, rowid, file_name, database_query)
+        VALUES ('delete', old.id, old.file_name, old.database_query);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS log_ingestor_log_fts_update AFTER UPDATE ON log_ingestor_log BEGIN
+        INSERT INTO log_ingestor_log_fts(log_ingestor_log_fts, rowid, file_name, database_query)
+        VALUES ('delete', old.id, old.file_name, old.database_query);
+        INSERT INTO log_ingestor_log_fts(rowid, file_name, database_query)
+        VALUES (new.id, new.file_name, new.database_query);
+    END
+    """,
+    # Index the rows that were ingested before this migration
+    "INSERT INTO log_ingestor_log_fts(log_ingestor_log_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS log_ingestor_log_fts_insert",
+    "DROP TRIGGER IF EXISTS log_ingestor_log_fts_delete",
+    "DROP TRIGGER IF EXISTS log_ingestor_log_fts_update",
+    "DROP TABLE IF EXISTS log_ingestor_log_fts",
+]
+
+# Expression indexes matching the UPPER(...) LIKE UPPER(...) SQL of icontains/istartswith
+POSTGRESQL_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS log_ingestor_log_query_trgm "
+    "ON log_ingestor_log USING gin (UPPER(database_query) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS log_ingestor_log_file_trgm "
+    "ON log_ingestor_log USING gin (UPPER(file_name) gin_trgm_ops)",
+]
+
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX IF EXISTS log_ingestor_log_query_trgm",
+    "DROP INDEX IF EXISTS log_ingestor_log_file_trgm",
+]
+
+
+def run_for_vendor(statements):
+    """
+    Returns a RunPython callable executing the statements for the active database vendor.
+    Other backends are left untouched and use unindexed ORM lookups.
+    """
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_ingestor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run_for_vendor({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:14
+
+import log_ingestor.fields
+from log_ingestor.iputils import ip_key
+from django.db import migrations, models
+
+
+def backfill_ip_key(apps, schema_editor):
+    """
+    Populates ip_key for rows stored before the column existed.
+    """
+    Log = apps.get_model('log_ingestor', 'Log')
+    batch = []
+    for row in Log.objects.only('id', 'ip_address').iterator(chunk_size=2000):
+        row.ip_key = ip_key(row.ip_address)
+        batch.append(row)
+        if len(batch) >= 2000:
+            Log.objects.bulk_update(batch, ['ip_key'])
+            batch = []
+    if batch:
+        Log.objects.bulk_update(batch, ['ip_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_ingestor', '0002_log_text_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='log',
+            name='as_org',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='log',
+            name='asn',
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='log',
+            name='country',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='log',
+            name='ip_key',
+            field=log_ingestor.fields.IPKeyField(db_index=True, editable=False, max_length=32, null=True),
+        ),
+        migrations.RunPython(backfill_ip_key, migrations.RunPython.noop),
+    ]
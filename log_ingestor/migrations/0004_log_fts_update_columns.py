@@ -0,0 +1,50 @@
+from django.db import migrations
+
+# Only changes to the indexed columns touch the full-text index, so updates of
+# ip_key, asn or the other enrichment columns no longer rewrite its postings
+SQLITE_FORWARD = [
+    "DROP TRIGGER IF EXISTS log_ingestor_log_fts_update",
+    """
+    CREATE TRIGGER log_ingestor_log_fts_update
+    AFTER UPDATE OF file_name, database_query ON log_ingestor_log BEGIN
+        INSERT INTO log_ingestor_log_fts(log_ingestor_log_fts, rowid, file_name, database_query)
+        VALUES ('delete', old.id, old.file_name, old.database_query);
+        INSERT INTO log_ingestor_log_fts(rowid, file_name, database_query)
+        VALUES (new.id, new.file_name, new.database_query);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS log_ingestor_log_fts_update",
+    """
+    CREATE TRIGGER log_ingestor_log_fts_update AFTER UPDATE ON log_ingestor_log BEGIN
+        INSERT INTO log_ingestor_log_fts(log_ingestor_log_fts, rowid, file_name, database_query)
+        VALUES ('delete', old.id, old.file_name, old.database_query);
+        INSERT INTO log_ingestor_log_fts(rowid, file_name, database_query)
+        VALUES (new.id, new.file_name, new.database_query);
+    END
+    """,
+]
+
+
+def run_on_sqlite(statements):
+    """
+    Returns a RunPython callable executing the statements on SQLite only, where the index triggers exist.
+    """
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_ingestor', '0003_log_ip_key_enrichment'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(SQLITE_FORWARD), run_on_sqlite(SQLITE_BACKWARD)),
+    ]
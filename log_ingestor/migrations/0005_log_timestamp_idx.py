@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('log_ingestor', '0004_log_fts_update_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['timestamp'], name='log_timestamp_idx'),
+        ),
+    ]
@@ -7,6 +7,8 @@ timestamps, user details, IP addresses, actions performed, file access, and data
 
 from django.db import models
 
+from .fields import IPKeyField
+
 
 class Log(models.Model):
     """
@@ -20,6 +22,10 @@ class Log(models.Model):
         action (CharField): Describes the action performed by the user.
         file_name (CharField, optional): Name of the accessed file, if applicable.
         database_query (TextField, optional): Stores database queries executed, if applicable.
+        ip_key (IPKeyField): Indexed integer encoding of ip_address, used for CIDR and range queries.
+        country (CharField, optional): Country of ip_address, set by IP enrichment.
+        asn (PositiveIntegerField, optional): Autonomous system number of ip_address, set by IP enrichment.
+        as_org (CharField, optional): Organization owning the autonomous system, set by IP enrichment.
     """
 
     id = models.AutoField(primary_key=True)  # Auto-incrementing primary key
@@ -29,6 +35,16 @@ class Log(models.Model):
     action = models.CharField(max_length=100)  # Description of the action performed
     file_name = models.CharField(max_length=255, null=True, blank=True)  # Optional file name if accessed
     database_query = models.TextField(null=True, blank=True)  # Optional database query executed by the user
+    ip_key = IPKeyField()  # Derived from ip_address on save, indexed for CIDR/range lookups
+    country = models.CharField(max_length=64, null=True, blank=True, editable=False)  # Enrichment: country
+    asn = models.PositiveIntegerField(null=True, blank=True, editable=False, db_index=True)  # Enrichment: ASN
+    as_org = models.CharField(max_length=255, null=True, blank=True, editable=False)  # Enrichment: AS owner
+
+    class Meta:
+        indexes = [
+            # Expired-row lookups of retention compaction (threat_analyzer.retention)
+            models.Index(fields=['timestamp'], name='log_timestamp_idx'),
+        ]
 
     def __str__(self):
         """
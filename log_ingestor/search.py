@@ -0,0 +1,120 @@
+"""
+Indexed text search over the `database_query` and `file_name` fields of Log.
+
+On SQLite the search runs against the FTS5 table `log_ingestor_log_fts`
+(trigram tokenizer, see migration 0002), which is kept in sync with the Log
+table by triggers, so every insert path (API, bulk_create, raw SQL) is indexed
+on ingest. On PostgreSQL the same migration adds `pg_trgm` GIN indexes on
+`UPPER(column)`, which serve Django's `icontains`/`istartswith` lookups directly.
+
+All matches are case-insensitive. Patterns shorter than three characters or
+containing LIKE wildcards cannot use the trigram index and fall back to plain
+ORM lookups, which are still correct but scan the table.
+"""
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# FTS5 shadow table maintained by triggers on log_ingestor_log
+FTS_TABLE = 'log_ingestor_log_fts'
+
+# Fields covered by the full-text index
+SEARCHABLE_FIELDS = ('database_query', 'file_name')
+
+# Trigram indexes need at least this many characters to narrow a search
+MIN_TRIGRAM_LENGTH = 3
+
+# Cache of FTS availability per database name
+_fts_available = {}
+
+
+def fts_enabled():
+    """
+    Checks whether the SQLite FTS5 index exists on the current database.
+
+    Returns:
+        bool: True when queries can be answered from `log_ingestor_log_fts`.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    name = str(connection.settings_dict['NAME'])
+    if name not in _fts_available:
+        _fts_available[name] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available[name]
+
+
+def _indexable(value):
+    """
+    Checks whether a search term can be answered from the trigram index.
+    """
+    return len(value) >= MIN_TRIGRAM_LENGTH and '%' not in value and '_' not in value
+
+
+def _fts_like(field, pattern):
+    """
+    Builds a filter selecting logs whose `field` matches a LIKE pattern in the FTS table.
+    """
+    return Q(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {field} LIKE %s", (pattern,)))
+
+
+def contains_filter(field, value):
+    """
+    Builds a case-insensitive substring filter on a searchable field.
+
+    Args:
+        field (str): One of SEARCHABLE_FIELDS.
+        value (str): Substring to look for, e.g. "DELETE FROM users".
+
+    Returns:
+        Q: Filter to apply to a Log queryset.
+    """
+    if field not in SEARCHABLE_FIELDS:
+        raise ValueError(f"{field} is not a searchable field")
+    if fts_enabled() and _indexable(value):
+        return _fts_like(field, f"%{value}%")
+    return Q(**{f"{field}__icontains": value})
+
+
+def prefix_filter(field, value):
+    """
+    Builds a case-insensitive prefix filter on a searchable field.
+
+    Args:
+        field (str): One of SEARCHABLE_FIELDS.
+        value (str): Prefix to look for, e.g. "/secure/".
+
+    Returns:
+        Q: Filter to apply to a Log queryset.
+    """
+    if field not in SEARCHABLE_FIELDS:
+        raise ValueError(f"{field} is not a searchable field")
+    if fts_enabled() and _indexable(value):
+        return _fts_like(field, f"{value}%")
+    return Q(**{f"{field}__istartswith": value})
+
+
+def token_filter(text):
+    """
+    Builds a filter requiring every whitespace-separated term of `text` to appear
+    in either `database_query` or `file_name`.
+
+    Args:
+        text (str): Search terms, e.g. "delete users".
+
+    Returns:
+        Q: Filter to apply to a Log queryset.
+    """
+    filters = Q()
+    indexed_terms = []
+
+    for term in text.split():
+        if fts_enabled() and len(term) >= MIN_TRIGRAM_LENGTH:
+            indexed_terms.append('"' + term.replace('"', '""') + '"')  # Quote as an FTS5 phrase
+        else:
+            filters &= Q(database_query__icontains=term) | Q(file_name__icontains=term)
+
+    if indexed_terms:
+        match = " AND ".join(indexed_terms)
+        filters &= Q(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,)))
+    return filters
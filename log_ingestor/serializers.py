@@ -2,10 +2,12 @@
 Serializer for the Log model.
 
 This module defines the LogSerializer class, which converts Log model instances 
-into JSON format and vice versa for API interactions.
+into JSON format and vice versa for API interactions. When IP enrichment is
+configured, incoming logs are tagged with country/ASN data during validation.
 """
 
 from rest_framework import serializers
+from .iputils import get_enrichment_index
 from .models import Log
 
 
@@ -18,9 +20,28 @@ class LogSerializer(serializers.ModelSerializer):
 
     Meta Attributes:
         model (Log): Specifies the model to serialize.
-        fields (str): Includes all fields from the Log model.
+        exclude (list): Hides the internal `ip_key` sort key; every other Log field is included.
+
+    The derived fields (country, asn, as_org) are read-only.
     """
 
     class Meta:
         model = Log  # Define the model to serialize
-        fields = '__all__'  # Include all fields from the Log model
+        exclude = ['ip_key']  # Internal IP range key, not part of the API
+
+    def validate(self, attrs):
+        """
+        Tags the log with enrichment data for its IP address, if enrichment is enabled.
+
+        Args:
+            attrs (dict): Validated field values.
+
+        Returns:
+            dict: The values, extended with country, asn and as_org when the IP is known.
+        """
+        index = get_enrichment_index()
+        if index is not None and attrs.get('ip_address'):
+            tags = index.lookup(attrs['ip_address'])
+            if tags:
+                attrs.update(tags)
+        return attrs
@@ -1,3 +1,259 @@
-from django.test import TestCase
+"""
+Tests for log search (the full-text index, its triggers and request validation),
+IP filters and enrichment, and the `collect_logs` collector.
+"""
 
-# Create your tests here.
+import io
+import json
+import os
+import queue
+import shutil
+import socket
+import tempfile
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from log_ingestor.collector import FileTailer, LineServer, RecordValidator, load_checkpoint
+from log_ingestor.iputils import get_enrichment_index
+from log_ingestor.models import Log
+from log_ingestor.serializers import LogSerializer
+from log_ingestor.search import contains_filter, fts_enabled, prefix_filter, token_filter
+
+ENRICHMENT_CSV = """start_ip,end_ip,country,asn,as_org
+10.0.0.0,10.0.0.255,US,64512,Example Net
+10.0.1.0,10.0.1.255,DE,64513,
+2001:db8::,2001:db8::ffff,NL,64514,Example v6
+"""
+
+SAMPLE_LOGS = [
+    ("admin42", "database_query", "", "DELETE FROM users WHERE id = 4"),
+    ("admin42", "database_query", "", "select * from Users"),
+    ("guest99", "file_access", "/secure/payroll.csv", ""),
+    ("guest99", "file_access", "/confidential/design.pdf", ""),
+    ("employee7", "file_access", "/reports/users_q1.pdf", "INSERT INTO audit VALUES (1)"),
+]
+
+
+class LogSearchTests(TestCase):
+    def setUp(self):
+        Log.objects.bulk_create([
+            Log(user_id=user, ip_address="10.0.0.1", action=action, file_name=file_name, database_query=query)
+            for user, action, file_name, query in SAMPLE_LOGS
+        ])
+
+    def ids(self, filters):
+        return set(Log.objects.filter(filters).values_list("id", flat=True))
+
+    def test_index_matches_plain_lookups(self):
+        self.assertTrue(fts_enabled())
+        for value in ["from users", "USERS", "/secure", "q1.pdf"]:
+            for field in ["database_query", "file_name"]:
+                self.assertEqual(self.ids(contains_filter(field, value)),
+                                 self.ids(Q(**{f"{field}__icontains": value})))
+                self.assertEqual(self.ids(prefix_filter(field, value)),
+                                 self.ids(Q(**{f"{field}__istartswith": value})))
+
+        expected = self.ids((Q(database_query__icontains="users") | Q(file_name__icontains="users"))
+                            & (Q(database_query__icontains="insert") | Q(file_name__icontains="insert")))
+        self.assertEqual(self.ids(token_filter("users insert")), expected)
+
+    def test_triggers_keep_index_in_sync(self):
+        log = Log.objects.get(database_query__startswith="DELETE")
+        log.database_query = "TRUNCATE accounts"
+        log.save()
+        self.assertEqual(self.ids(contains_filter("database_query", "truncate")), {log.id})
+        self.assertNotIn(log.id, self.ids(contains_filter("database_query", "delete from")))
+
+        # Updates of other columns leave the index alone
+        Log.objects.filter(id=log.id).update(asn=64512)
+        self.assertEqual(self.ids(contains_filter("database_query", "truncate")), {log.id})
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'log_ingestor_log_fts_update'")
+            self.assertIn("UPDATE OF file_name, database_query", cursor.fetchone()[0])
+
+        log.delete()
+        self.assertEqual(self.ids(contains_filter("database_query", "truncate")), set())
+
+    def test_non_string_search_values_are_rejected(self):
+        client = APIClient()
+        for payload in [{"text": 123}, {"databaseQuery": 5}, {"fileNamePrefix": ["/secure"]}]:
+            response = client.post("/api/logs/search", payload, format="json")
+            self.assertEqual(response.status_code, 400, payload)
+            self.assertIn("error", response.json())
+
+        response = client.post("/api/logs/search", {"databaseQuery": "delete"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["data"]), 1)
+
+
+class LogIPFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Log.objects.bulk_create([
+            Log(user_id="u1", ip_address="10.0.0.1", action="login_success", asn=64512),
+            Log(user_id="u2", ip_address="10.0.1.200", action="login_success", asn=64513),
+            Log(user_id="u3", ip_address="192.168.1.20", action="login_success"),
+            Log(user_id="u4", ip_address="2001:db8::1", action="login_success"),
+        ])
+
+    def search(self, payload):
+        return self.client.post("/api/logs/search", payload, format="json")
+
+    def users(self, payload):
+        response = self.search(payload)
+        self.assertEqual(response.status_code, 200)
+        return {log["user_id"] for log in response.json()["data"]}
+
+    def test_network_range_and_asn_filters(self):
+        self.assertEqual(self.users({"ipNetwork": "10.0.0.0/16"}), {"u1", "u2"})
+        self.assertEqual(self.users({"ipNetwork": "2001:db8::/32"}), {"u4"})
+        self.assertEqual(self.users({"ipRangeStart": "10.0.0.2", "ipRangeEnd": "192.168.1.20"}), {"u2", "u3"})
+        self.assertEqual(self.users({"asn": "64513"}), {"u2"})
+        self.assertEqual(self.users({"asn": 64512}), {"u1"})
+
+    def test_invalid_ip_filters_are_rejected(self):
+        for payload in [{"asn": "abc"}, {"asn": "AS-1"}, {"ipNetwork": "10.0.0.0/33"}, {"ipRangeStart": "nope"}]:
+            response = self.search(payload)
+            self.assertEqual(response.status_code, 400, payload)
+            self.assertIn("error", response.json())
+
+    def test_ip_key_is_not_exposed(self):
+        log = self.search({"asn": "64512"}).json()["data"][0]
+        self.assertNotIn("ip_key", log)
+        self.assertIn("asn", log)
+        self.assertNotIn("ip_key", self.client.get(f"/api/logs/{log['id']}").json())
+
+    def test_enrichment_tags_ranges_and_new_logs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ranges.csv")
+            with open(path, "w") as csvfile:
+                csvfile.write(ENRICHMENT_CSV)
+
+            with override_settings(IP_ENRICHMENT_DATABASE=path):
+                index = get_enrichment_index()
+                self.assertEqual(len(index), 3)
+                # Both ends of a range are inside it, the neighbours are not
+                self.assertEqual(index.lookup("10.0.0.0")["country"], "US")
+                self.assertEqual(index.lookup("10.0.0.255")["country"], "US")
+                self.assertEqual(index.lookup("10.0.1.0"), {"country": "DE", "asn": 64513, "as_org": None})
+                self.assertIsNone(index.lookup("9.255.255.255"))
+                self.assertIsNone(index.lookup("10.0.2.0"))
+                self.assertEqual(index.lookup("2001:db8::ffff")["asn"], 64514)
+                self.assertIsNone(index.lookup("2001:db8::1:0"))
+                self.assertIsNone(index.lookup("not an ip"))
+
+                response = self.client.post("/api/logs", {"user_id": "u5", "ip_address": "10.0.1.7",
+                                                          "action": "login_success", "country": "XX"}, format="json")
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual((response.json()["country"], response.json()["asn"]), ("DE", 64513))
+                self.assertEqual(self.users({"asn": 64513}), {"u2", "u5"})
+
+                response = self.client.post("/api/logs", {"user_id": "u6", "ip_address": "172.16.0.1",
+                                                          "action": "login_success"}, format="json")
+                self.assertEqual(response.status_code, 201)
+                self.assertIsNone(response.json()["asn"])
+
+
+class CollectorTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "activity.log")
+        self.checkpoint = os.path.join(self.directory, "checkpoint.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def append(self, text, path=None):
+        with open(path or self.path, "a") as handle:
+            handle.write(text)
+
+    def test_tailer_waits_for_partial_lines(self):
+        self.append("a\nb")
+        tailer = FileTailer(self.path)
+        self.assertEqual(list(tailer.read_lines()), ["a"])
+        self.assertEqual(tailer.offset, 2)
+        self.append("c\n")
+        self.assertEqual(list(tailer.read_lines()), ["bc"])
+        tailer.close()
+
+    def test_tailer_follows_rotation_and_truncation(self):
+        self.append("1\n")
+        tailer = FileTailer(self.path)
+        self.assertEqual(list(tailer.read_lines()), ["1"])
+
+        # Rotation: the old file is drained before switching to the new one
+        self.append("2\n")
+        os.rename(self.path, f"{self.path}.1")
+        self.append("3\n")
+        self.assertEqual(list(tailer.read_lines()), ["2", "3"])
+
+        # Truncation in place (copytruncate)
+        with open(self.path, "w") as handle:
+            handle.write("\n")
+        self.assertEqual(list(tailer.read_lines()), [""])
+        self.append("4\n")
+        self.assertEqual(list(tailer.read_lines()), ["4"])
+        tailer.close()
+
+    def collect(self):
+        call_command("collect_logs", self.path, "--format", "csv", "--once", "--checkpoint", self.checkpoint,
+                     stdout=io.StringIO())
+
+    def test_checkpoint_resumes_and_keeps_other_files(self):
+        with open(self.checkpoint, "w") as handle:
+            json.dump({"/var/log/other.log": {"inode": 1, "offset": 42}}, handle)
+        self.append("timestamp,user_id,ip_address,action,file_name,database_query\n"
+                    "2025-03-26 10:00:00,u1,10.0.0.1,login_success,,\n"
+                    "2025-03-26 10:00:01,u2,10.0.0.2,login_failed,,\n")
+        self.collect()
+        self.assertEqual(Log.objects.count(), 2)
+
+        self.append("2025-03-26 10:00:02,u3,not-an-ip,login_failed,,\n"
+                    "2025-03-26 10:00:03,u4,10.0.0.4,login_success,,\n")
+        self.collect()
+        self.assertEqual(sorted(Log.objects.values_list("user_id", flat=True)), ["u1", "u2", "u4"])
+
+        checkpoint = load_checkpoint(self.checkpoint)
+        self.assertEqual(checkpoint["/var/log/other.log"], {"inode": 1, "offset": 42})
+        self.assertEqual(checkpoint[self.path]["offset"], os.path.getsize(self.path))
+
+    def test_validator_matches_log_serializer(self):
+        validator = RecordValidator()
+        records = [
+            {"user_id": "u1", "ip_address": "10.0.0.1", "action": "login_success"},
+            {"user_id": "u1", "ip_address": "2001:db8::1", "action": "file_access", "file_name": None,
+             "country": "XX", "ip_key": "0"},
+            {"user_id": "u1", "ip_address": "999.0.0.1", "action": "login_success"},
+            {"user_id": "u1", "ip_address": "10.0.0.1"},
+            {"user_id": "u" * 101, "ip_address": "10.0.0.1", "action": "login_success", "file_name": "f" * 256},
+            {"user_id": "", "ip_address": "", "action": ["login_success"]},
+        ]
+        for record in records:
+            serializer = LogSerializer(data=record)
+            try:
+                attrs = validator.validate(record)
+            except serializers.ValidationError as exc:
+                self.assertFalse(serializer.is_valid(), record)
+                self.assertEqual(set(exc.detail), set(serializer.errors), record)
+            else:
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+                self.assertEqual(attrs, dict(serializer.validated_data))
+
+    def test_socket_ingest(self):
+        for protocol, kind in [("udp", socket.SOCK_DGRAM), ("tcp", socket.SOCK_STREAM)]:
+            lines = queue.Queue()
+            server = LineServer(protocol, ("127.0.0.1", 0), lines)
+            server.start()
+            try:
+                with socket.socket(socket.AF_INET, kind) as client:
+                    client.connect(server.address)
+                    client.sendall(b'{"user_id": "u1"}\n{"user_id": "u2"}\n')
+                received = [lines.get(timeout=5).strip() for _ in range(2)]
+            finally:
+                server.stop()
+            self.assertEqual(received, ['{"user_id": "u1"}', '{"user_id": "u2"}'], protocol)
@@ -9,10 +9,15 @@ from rest_framework import generics
 from django.db.models import Q
 from .models import Log
 from .serializers import LogSerializer
+from .search import contains_filter, prefix_filter, token_filter
+from .iputils import network_filter, range_filter
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
+# Search parameters backed by the full-text index
+TEXT_SEARCH_PARAMS = ["databaseQuery", "databaseQueryPrefix", "fileNameContains", "fileNamePrefix", "text"]
+
 
 class LogListCreateView(generics.ListCreateAPIView):
     """
@@ -41,13 +46,24 @@ class LogSearchView(APIView):
 
     - POST: Retrieve logs by filtering based on timestamp, user ID, IP address, action, and file name.
 
+    Text search (case-insensitive, served by the full-text index in `search.py`):
+    - databaseQuery / fileNameContains: substring match on database_query / file_name.
+    - databaseQueryPrefix / fileNamePrefix: prefix match on database_query / file_name.
+    - text: every whitespace-separated term must appear in database_query or file_name.
+
+    IP filters (served by the indexed ip_key column):
+    - ipNetwork: CIDR block, e.g. "10.0.0.0/8".
+    - ipRangeStart / ipRangeEnd: inclusive address range.
+    - asn / country: enrichment tags, when IP enrichment is enabled.
+
     Request Body (JSON):
     {
         "timestamp": "2025-03-26T14:35:21Z",
         "userId": "user123",
         "ipAddress": "192.168.1.10",
         "action": "fileAccess",
-        "fileName": "/secure/payroll.csv"
+        "fileName": "/secure/payroll.csv",
+        "databaseQuery": "DELETE FROM users"
     }
 
     Response:
@@ -77,6 +93,21 @@ class LogSearchView(APIView):
         ip_address = data.get("ipAddress")
         action = data.get("action")
         file_name = data.get("fileName")
+        database_query = data.get("databaseQuery")
+        database_query_prefix = data.get("databaseQueryPrefix")
+        file_name_contains = data.get("fileNameContains")
+        file_name_prefix = data.get("fileNamePrefix")
+        text = data.get("text")
+        ip_network = data.get("ipNetwork")
+        ip_range_start = data.get("ipRangeStart")
+        ip_range_end = data.get("ipRangeEnd")
+        asn = data.get("asn")
+        country = data.get("country")
+
+        # Text search values are matched as substrings/tokens, so they must be strings
+        for name in TEXT_SEARCH_PARAMS:
+            if data.get(name) is not None and not isinstance(data.get(name), str):
+                return Response({"error": f"{name} must be a string"}, status=status.HTTP_400_BAD_REQUEST)
 
         # Apply filters dynamically if parameters are provided
         if timestamp:
@@ -90,6 +121,33 @@ class LogSearchView(APIView):
         if file_name:
             filters &= Q(file_name=file_name)
 
+        # Apply text search filters backed by the full-text index
+        if database_query:
+            filters &= contains_filter("database_query", database_query)
+        if database_query_prefix:
+            filters &= prefix_filter("database_query", database_query_prefix)
+        if file_name_contains:
+            filters &= contains_filter("file_name", file_name_contains)
+        if file_name_prefix:
+            filters &= prefix_filter("file_name", file_name_prefix)
+        if text:
+            filters &= token_filter(text)
+
+        # Apply IP network/range and enrichment filters
+        try:
+            if ip_network:
+                filters &= network_filter(ip_network)
+            if ip_range_start or ip_range_end:
+                filters &= range_filter(ip_range_start, ip_range_end)
+            if asn:
+                if not str(asn).isdigit():
+                    raise ValueError(f"'{asn}' is not a valid ASN")
+                filters &= Q(asn=int(asn))
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if country:
+            filters &= Q(country=country)
+
         # Query logs with applied filters
         logs = Log.objects.filter(filters)
         serializer = LogSerializer(logs, many=True)
@@ -0,0 +1,328 @@
+"""
+Statistical anomaly detection alongside the rule-based `detect_threats`.
+
+Each user gets a small baseline that is updated incrementally:
+
+- an exponentially weighted mean and variance of the number of events per
+  active hour, used to flag activity spikes;
+- the IP addresses and files the user recently worked with, used to flag
+  activity from an unusual IP or on an unusual file.
+
+Memory per user is bounded: a handful of scalars plus at most
+`MAX_TRACKED_IPS` addresses and `MAX_TRACKED_FILES` files, least recently
+used entries being evicted first.
+
+`AnomalyDetector.observe` processes a single event in O(1) for streaming
+sources. `AnomalyDetector.observe_batch` processes an uploaded DataFrame:
+sorting, warm-up counts and spike detection are vectorized, with only the
+per-user hourly buckets walked in Python to advance the moving averages. The
+IP/file novelty checks replay the bounded LRU histories over plain columns,
+because whether a value was evicted depends on every value used in between.
+Both paths report the same threats for the same events in timestamp order,
+however the events are split across batches.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from threat_analyzer.models import AnomalyBaseline, Threat
+
+# Smoothing factor of the hourly activity moving average
+EWMA_ALPHA = 0.2
+
+# Standard deviations above the mean that make an hour a spike
+SPIKE_Z_SCORE = 3.0
+
+# Completed active hours required before spikes are reported
+WARMUP_HOURS = 3
+
+# Events in an hour below which no spike is reported
+MIN_SPIKE_EVENTS = 5
+
+# Events required before unusual IPs or files are reported
+WARMUP_EVENTS = 20
+
+# Bounds on the per-user IP and file history
+MAX_TRACKED_IPS = 32
+MAX_TRACKED_FILES = 64
+
+# Threat types and severities produced by this engine
+ACTIVITY_SPIKE = ("ActivitySpike", "Medium")
+UNUSUAL_IP = ("UnusualIP", "Medium")
+UNUSUAL_FILE_ACCESS = ("UnusualFileAccess", "Low")
+
+# Keeps `user_id__in` lookups below SQLite's bound-parameter limit
+QUERY_CHUNK_SIZE = 500
+
+NANOSECONDS_PER_HOUR = 3600 * 10 ** 9
+
+
+class Baseline:
+    """
+    Incrementally maintained activity profile of a single user.
+
+    Attributes:
+        events (int): Events observed so far.
+        n_hours (int): Completed active hours folded into the moving average.
+        rate_mean (float): EWMA of events per active hour.
+        rate_var (float): EWMA variance of events per active hour.
+        hour (int | None): Current hour bucket (hours since the epoch).
+        hour_count (int): Events observed in the current hour bucket.
+        spike_flagged (bool): Whether the current hour was already reported as a spike.
+        ips (dict): Recently used IP addresses mapped to the hour they were last seen.
+        files (dict): Recently accessed files mapped to the hour they were last seen.
+    """
+
+    __slots__ = ("events", "n_hours", "rate_mean", "rate_var", "hour", "hour_count", "spike_flagged",
+                 "ips", "files")
+
+    def __init__(self):
+        self.events = 0
+        self.n_hours = 0
+        self.rate_mean = 0.0
+        self.rate_var = 0.0
+        self.hour = None
+        self.hour_count = 0
+        self.spike_flagged = False
+        self.ips = {}
+        self.files = {}
+
+    def roll(self, hour):
+        """
+        Closes the current hour bucket, folding its count into the moving average, and opens `hour`.
+        """
+        if self.hour_count > 0:
+            if self.n_hours == 0:
+                self.rate_mean = float(self.hour_count)
+                self.rate_var = 0.0
+            else:
+                diff = self.hour_count - self.rate_mean
+                increment = EWMA_ALPHA * diff
+                self.rate_mean += increment
+                self.rate_var = (1 - EWMA_ALPHA) * (self.rate_var + diff * increment)
+            self.n_hours += 1
+        self.hour = hour
+        self.hour_count = 0
+        self.spike_flagged = False
+
+    def spike_threshold(self):
+        """
+        Returns the event count at which the current hour becomes a spike, or None if none can be reported.
+        """
+        if self.spike_flagged or self.n_hours < WARMUP_HOURS:
+            return None
+        limit = self.rate_mean + SPIKE_Z_SCORE * math.sqrt(self.rate_var)
+        return max(math.floor(limit) + 1, MIN_SPIKE_EVENTS)
+
+    def to_dict(self):
+        """
+        Serializes the baseline into a JSON-compatible dictionary.
+        """
+        return {
+            "events": self.events,
+            "n_hours": self.n_hours,
+            "rate_mean": self.rate_mean,
+            "rate_var": self.rate_var,
+            "hour": self.hour,
+            "hour_count": self.hour_count,
+            "spike_flagged": self.spike_flagged,
+            "ips": self.ips,
+            "files": self.files,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Restores a baseline serialized with `to_dict`.
+        """
+        baseline = cls()
+        for name in cls.__slots__:
+            if name in data:
+                setattr(baseline, name, data[name])
+        baseline.ips = dict(baseline.ips)
+        baseline.files = dict(baseline.files)
+        return baseline
+
+
+def _remember(history, key, hour, limit):
+    """
+    Marks `key` as most recently used and evicts the least recently used entries beyond `limit`.
+    """
+    history.pop(key, None)
+    history[key] = hour
+    while len(history) > limit:
+        del history[next(iter(history))]
+
+
+def _is_missing(value):
+    """
+    Checks whether a log field is empty (None, NaN or an empty string).
+    """
+    return value is None or value == "" or (isinstance(value, float) and math.isnan(value))
+
+
+class AnomalyDetector:
+    """
+    Flags deviations from per-user baselines as `Threat` instances.
+    """
+
+    def __init__(self, baselines=None):
+        """
+        Args:
+            baselines (dict, optional): Mapping of user ID to `Baseline` to resume from.
+        """
+        self.baselines = baselines if baselines is not None else {}
+
+    def observe(self, user, timestamp, ip, action, file_name):
+        """
+        Processes a single event in constant time.
+
+        Args:
+            user (str): User ID of the event.
+            timestamp: Event time (anything accepted by `pd.Timestamp`).
+            ip (str): Source IP address.
+            action (str): Action performed.
+            file_name (str | None): File accessed, if any.
+
+        Returns:
+            List[Threat]: Threats raised by this event.
+        """
+        timestamp = pd.Timestamp(timestamp)
+        hour = timestamp.value // NANOSECONDS_PER_HOUR
+        baseline = self.baselines.setdefault(user, Baseline())
+        found = []
+
+        if hour != baseline.hour:
+            baseline.roll(hour)
+        threshold = baseline.spike_threshold()
+        baseline.hour_count += 1
+        if threshold is not None and baseline.hour_count >= threshold:
+            baseline.spike_flagged = True
+            found.append(ACTIVITY_SPIKE)
+
+        warm = baseline.events >= WARMUP_EVENTS
+        if warm and ip not in baseline.ips:
+            found.append(UNUSUAL_IP)
+        _remember(baseline.ips, ip, hour, MAX_TRACKED_IPS)
+
+        if not _is_missing(file_name):
+            if warm and file_name not in baseline.files:
+                found.append(UNUSUAL_FILE_ACCESS)
+            _remember(baseline.files, file_name, hour, MAX_TRACKED_FILES)
+
+        baseline.events += 1
+        return [Threat(timestamp=timestamp, user_id=user, ip_address=ip, action=action, file_name=file_name,
+                       threat_type=threat_type, severity=severity) for threat_type, severity in found]
+
+    def observe_batch(self, logs_df):
+        """
+        Processes a DataFrame of logs with vectorized operations.
+
+        Args:
+            logs_df (pd.DataFrame): Logs with 'timestamp', 'user_id', 'ip_address', 'action' and 'file_name'.
+
+        Returns:
+            List[Threat]: Threats raised by the batch, in timestamp order.
+        """
+        if logs_df.empty:
+            return []
+
+        df = logs_df.assign(timestamp=pd.to_datetime(logs_df["timestamp"])).sort_values(
+            by="timestamp", kind="stable").reset_index(drop=True)
+        users = df["user_id"]
+        hours = pd.Series(df["timestamp"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+                          // NANOSECONDS_PER_HOUR)
+        has_file = ~df["file_name"].isna() & (df["file_name"] != "")
+
+        # Event index per user, continuing from the persisted event counts
+        prior_events = users.map({u: b.events for u, b in self.baselines.items()}).fillna(0).astype(np.int64)
+        warm = (users.groupby(users).cumcount() + prior_events) >= WARMUP_EVENTS
+
+        # Unusual IP / file: replay the bounded histories event by event, exactly as `observe` does
+        unusual_ip = np.zeros(len(df), dtype=bool)
+        unusual_file = np.zeros(len(df), dtype=bool)
+        rows = zip(users.tolist(), df["ip_address"].tolist(), df["file_name"].tolist(), hours.tolist(),
+                   warm.tolist(), has_file.tolist())
+        for i, (user, ip, file_name, hour, is_warm, accessed_file) in enumerate(rows):
+            baseline = self.baselines.setdefault(user, Baseline())
+            if is_warm and ip not in baseline.ips:
+                unusual_ip[i] = True
+            _remember(baseline.ips, ip, hour, MAX_TRACKED_IPS)
+            if accessed_file:
+                if is_warm and file_name not in baseline.files:
+                    unusual_file[i] = True
+                _remember(baseline.files, file_name, hour, MAX_TRACKED_FILES)
+
+        # Activity spikes: walk hourly buckets per user to advance the moving averages
+        buckets = pd.DataFrame({"user": users, "hour": hours})
+        bucket_stats = []
+        for (user, hour), count in buckets.groupby(["user", "hour"], sort=False).size().items():
+            hour = int(hour)
+            baseline = self.baselines.setdefault(user, Baseline())
+            if hour != baseline.hour:
+                baseline.roll(hour)
+            threshold = baseline.spike_threshold()
+            bucket_stats.append((user, hour, baseline.hour_count, threshold if threshold is not None else -1))
+            baseline.hour_count += int(count)
+            if threshold is not None and baseline.hour_count >= threshold:
+                baseline.spike_flagged = True
+
+        # The spike is reported on the event whose running count in the bucket reaches the threshold
+        stats = buckets.merge(pd.DataFrame(bucket_stats, columns=["user", "hour", "offset", "threshold"]),
+                              on=["user", "hour"], how="left")
+        running_count = stats["offset"] + buckets.groupby(["user", "hour"]).cumcount() + 1
+        spike = (running_count == stats["threshold"]).to_numpy()
+
+        # Fold the event counts into the baselines
+        for user, count in users.value_counts().items():
+            self.baselines[user].events += int(count)
+
+        threats = []
+        flags = [(spike, ACTIVITY_SPIKE), (unusual_ip, UNUSUAL_IP), (unusual_file, UNUSUAL_FILE_ACCESS)]
+        for mask, (threat_type, severity) in flags:
+            for row in df.loc[mask, ["timestamp", "user_id", "ip_address", "action", "file_name"]].itertuples(
+                    index=False):
+                threats.append(Threat(timestamp=row.timestamp, user_id=row.user_id, ip_address=row.ip_address,
+                                      action=row.action, file_name=row.file_name, threat_type=threat_type,
+                                      severity=severity))
+        threats.sort(key=lambda threat: threat.timestamp)
+        return threats
+
+
+def load_baselines(user_ids):
+    """
+    Loads persisted baselines for the given users.
+
+    Args:
+        user_ids (Iterable[str]): Users present in the upload being analyzed.
+
+    Returns:
+        dict: Mapping of user ID to `Baseline`.
+    """
+    user_ids = list(user_ids)
+    baselines = {}
+    for i in range(0, len(user_ids), QUERY_CHUNK_SIZE):
+        rows = AnomalyBaseline.objects.filter(user_id__in=user_ids[i:i + QUERY_CHUNK_SIZE])
+        for user_id, data in rows.values_list("user_id", "baseline"):
+            baselines[user_id] = Baseline.from_dict(data)
+    return baselines
+
+
+def save_baselines(baselines):
+    """
+    Persists baselines, inserting or updating one row per user.
+
+    Args:
+        baselines (dict): Mapping of user ID to `Baseline`.
+    """
+    rows = [AnomalyBaseline(user_id=user, baseline=baseline.to_dict()) for user, baseline in baselines.items()]
+    with transaction.atomic():
+        AnomalyBaseline.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["user_id"],
+            update_fields=["baseline", "updated_at"],
+        )
@@ -0,0 +1,136 @@
+"""
+Correlation of detected threats into incidents.
+
+A burst of activity typically yields hundreds of near-identical threats (the
+same user, threat type and IP address, minutes apart). `correlate_threats`
+merges each threat into the most recent incident for its `(user_id,
+threat_type, ip_address)` key whose time span, widened by the correlation gap,
+contains the threat, and opens a new incident otherwise. A late threat that
+would bridge two existing incidents joins the more recent one; incidents are
+never merged with each other. Only incidents that can still
+absorb the new threats are loaded, through the `incident_correlation_idx`
+index, so the cost of a run depends on the size of the batch rather than on
+the history.
+"""
+
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from threat_analyzer.models import Incident
+
+# Number of threats kept verbatim on each incident
+MAX_SAMPLE_EVENTS = 5
+
+# Ordering used to keep the highest severity of the grouped threats
+SEVERITY_RANK = {"Low": 0, "Medium": 1, "High": 2, "Critical": 3}
+
+# Keeps `user_id__in` lookups below SQLite's bound-parameter limit
+QUERY_CHUNK_SIZE = 500
+
+
+def correlation_gap():
+    """
+    Returns the maximum time between two threats of the same incident.
+    """
+    return timedelta(seconds=getattr(settings, 'INCIDENT_CORRELATION_GAP_SECONDS', 900))
+
+
+def _aware(value):
+    """
+    Converts a (possibly pandas, possibly naive) timestamp to an aware datetime.
+    """
+    if hasattr(value, 'to_pydatetime'):
+        value = value.to_pydatetime()
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.get_default_timezone())
+    return value
+
+
+def _sample(threat):
+    """
+    Returns the JSON summary of a threat stored in `Incident.sample_events`.
+    """
+    file_name = threat.file_name
+    if isinstance(file_name, float) and math.isnan(file_name):
+        file_name = None
+    return {"timestamp": _aware(threat.timestamp).isoformat(), "action": threat.action, "file_name": file_name}
+
+
+def _open_incidents(user_ids, since):
+    """
+    Loads the incidents of `user_ids` last seen after `since`, grouped by key, oldest first.
+    """
+    user_ids = list(user_ids)
+    incidents = {}
+    for i in range(0, len(user_ids), QUERY_CHUNK_SIZE):
+        rows = Incident.objects.filter(user_id__in=user_ids[i:i + QUERY_CHUNK_SIZE], last_seen__gte=since)
+        for incident in rows.order_by('last_seen'):
+            incidents.setdefault((incident.user_id, incident.threat_type, incident.ip_address), []).append(incident)
+    return incidents
+
+
+def _matching_incident(candidates, timestamp, gap):
+    """
+    Returns the most recent candidate incident whose span, widened by `gap`, contains `timestamp`.
+    """
+    for incident in reversed(candidates):
+        if incident.first_seen - gap <= timestamp <= incident.last_seen + gap:
+            return incident
+    return None
+
+
+def correlate_threats(threats, gap=None):
+    """
+    Groups threats into incidents and persists the new and updated incidents.
+
+    Each threat gets its `incident` attribute set, so saving the threats
+    afterwards links them to their incident.
+
+    Args:
+        threats (List[Threat]): Unsaved threats, in any order.
+        gap (timedelta, optional): Overrides the configured correlation gap.
+
+    Returns:
+        List[Incident]: The incidents created or updated by this batch.
+    """
+    if not threats:
+        return []
+    gap = gap or correlation_gap()
+
+    ordered = sorted(threats, key=lambda threat: _aware(threat.timestamp))
+    since = _aware(ordered[0].timestamp) - gap
+    incidents = _open_incidents({threat.user_id for threat in ordered}, since)
+    touched = {}
+
+    for threat in ordered:
+        timestamp = _aware(threat.timestamp)
+        candidates = incidents.setdefault((threat.user_id, threat.threat_type, threat.ip_address), [])
+        incident = _matching_incident(candidates, timestamp, gap)
+
+        if incident is None:
+            incident = Incident(user_id=threat.user_id, threat_type=threat.threat_type,
+                                ip_address=threat.ip_address, severity=threat.severity,
+                                first_seen=timestamp, last_seen=timestamp, count=0, sample_events=[])
+            candidates.append(incident)
+
+        incident.count += 1
+        incident.first_seen = min(incident.first_seen, timestamp)
+        incident.last_seen = max(incident.last_seen, timestamp)
+        if SEVERITY_RANK.get(threat.severity, -1) > SEVERITY_RANK.get(incident.severity, -1):
+            incident.severity = threat.severity
+        if len(incident.sample_events) < MAX_SAMPLE_EVENTS:
+            incident.sample_events.append(_sample(threat))
+
+        threat.incident = incident
+        touched[id(incident)] = incident
+
+    created = [incident for incident in touched.values() if incident.pk is None]
+    updated = [incident for incident in touched.values() if incident.pk is not None]
+    with transaction.atomic():
+        Incident.objects.bulk_create(created)
+        Incident.objects.bulk_update(updated, ['severity', 'first_seen', 'last_seen', 'count', 'sample_events'])
+    return list(touched.values())
@@ -0,0 +1,164 @@
+"""
+Serialization of the `detect_threats` trackers between analyze calls.
+
+`detect_threats` keeps three per-user trackers while it walks a log file:
+
+- `login_failures`: timestamps of failed logins (credential stuffing, privilege escalation)
+- `user_ip_timestamps`: `(timestamp, ip)` of the last event (account takeover)
+- `file_access_tracker`: timestamps of recent restricted file reads (data exfiltration)
+
+This module turns them into a compact JSON snapshot per user and back. Entries
+that can no longer influence any rule are pruned against the newest timestamp
+seen, so the snapshot stays small no matter how much history was analyzed.
+Snapshots are stored in the `DetectorState` model and record that timestamp as
+`as_of`, so analyzing an older file late never rolls back newer state.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+
+from threat_analyzer.models import DetectorState
+
+# Rule windows shared with detect_threats
+CREDENTIAL_STUFFING_THRESHOLD = 3  # Failed logins required before a successful login
+PRIVILEGE_ESCALATION_WINDOW = timedelta(minutes=5)  # Dangerous query after a failed login
+ACCOUNT_TAKEOVER_WINDOW = timedelta(minutes=10)  # IP change before a restricted file read
+DATA_EXFILTRATION_WINDOW = timedelta(seconds=30)  # Burst of restricted file reads
+
+# Keeps `user_id__in` lookups below SQLite's bound-parameter limit
+QUERY_CHUNK_SIZE = 500
+
+
+def restore_trackers(snapshots, until=None):
+    """
+    Rebuilds the `detect_threats` trackers from persisted per-user snapshots.
+
+    Args:
+        snapshots (dict): Mapping of user ID to snapshot, as produced by `snapshot_trackers`.
+        until (pd.Timestamp, optional): First timestamp of the upload. Entries newer than it come
+                                        from a later file and are left out, so an older file
+                                        is analyzed against the history that preceded it.
+
+    Returns:
+        tuple: `(login_failures, user_ip_timestamps, file_access_tracker)` dictionaries.
+    """
+    import pandas as pd  # Only needed once an analysis runs, see ThreatAnalyzeView
+
+    login_failures = {}
+    user_ip_timestamps = {}
+    file_access_tracker = {}
+
+    def restored(values):
+        timestamps = [pd.Timestamp(t) for t in values]
+        return timestamps if until is None else [t for t in timestamps if t <= until]
+
+    for user, snapshot in snapshots.items():
+        failures = restored(snapshot.get("login_failures") or [])
+        if failures:
+            login_failures[user] = failures
+        if snapshot.get("last_seen"):
+            seen_at, ip = snapshot["last_seen"]
+            seen_at = pd.Timestamp(seen_at)
+            if until is None or seen_at <= until:
+                user_ip_timestamps[user] = (seen_at, ip)
+        reads = restored(snapshot.get("restricted_access") or [])
+        if reads:
+            file_access_tracker[user] = reads
+
+    return login_failures, user_ip_timestamps, file_access_tracker
+
+
+def snapshot_trackers(login_failures, user_ip_timestamps, file_access_tracker, now):
+    """
+    Serializes the `detect_threats` trackers, keeping only entries that can still trigger a rule.
+
+    - Only the last `CREDENTIAL_STUFFING_THRESHOLD` login failures are kept: the
+      credential stuffing rule only counts up to that many, and the privilege
+      escalation rule only depends on the most recent failure.
+    - The last seen IP is dropped once it is older than `ACCOUNT_TAKEOVER_WINDOW`.
+    - Restricted file reads older than `DATA_EXFILTRATION_WINDOW` are dropped.
+
+    Args:
+        login_failures (dict): User ID to list of failed login timestamps.
+        user_ip_timestamps (dict): User ID to `(timestamp, ip)` of the last event.
+        file_access_tracker (dict): User ID to list of restricted file read timestamps.
+        now (pd.Timestamp): Newest timestamp analyzed so far, used as the pruning reference.
+
+    Returns:
+        dict: Mapping of user ID to snapshot. Every snapshot records `now` as `as_of`.
+    """
+    users = set(login_failures) | set(user_ip_timestamps) | set(file_access_tracker)
+    snapshots = {}
+
+    for user in users:
+        snapshot = {"as_of": now.isoformat()}
+
+        failures = login_failures.get(user) or []
+        if failures:
+            snapshot["login_failures"] = [t.isoformat() for t in failures[-CREDENTIAL_STUFFING_THRESHOLD:]]
+
+        last_seen = user_ip_timestamps.get(user)
+        if last_seen and now - last_seen[0] <= ACCOUNT_TAKEOVER_WINDOW:
+            snapshot["last_seen"] = [last_seen[0].isoformat(), last_seen[1]]
+
+        reads = [t for t in file_access_tracker.get(user) or [] if now - t <= DATA_EXFILTRATION_WINDOW]
+        if reads:
+            snapshot["restricted_access"] = [t.isoformat() for t in reads]
+
+        snapshots[user] = snapshot
+
+    return snapshots
+
+
+def load_snapshots(user_ids):
+    """
+    Loads persisted snapshots for the given users.
+
+    Args:
+        user_ids (Iterable[str]): Users present in the upload being analyzed.
+
+    Returns:
+        dict: Mapping of user ID to snapshot for users that have persisted state.
+    """
+    user_ids = list(user_ids)
+    snapshots = {}
+    for i in range(0, len(user_ids), QUERY_CHUNK_SIZE):
+        chunk = user_ids[i:i + QUERY_CHUNK_SIZE]
+        snapshots.update(DetectorState.objects.filter(user_id__in=chunk).values_list("user_id", "state"))
+    return snapshots
+
+
+def save_snapshots(snapshots):
+    """
+    Persists per-user snapshots, deleting rows for users whose snapshot became empty.
+
+    A stored snapshot whose `as_of` is newer than the one being saved is kept:
+    it was written by a later file (possibly analyzed concurrently) and already
+    includes everything the older file could contribute to future detections.
+
+    Args:
+        snapshots (dict): Mapping of user ID to snapshot, as produced by `snapshot_trackers`.
+    """
+    import pandas as pd  # Only needed once an analysis runs, see ThreatAnalyzeView
+
+    with transaction.atomic():
+        users = list(snapshots)
+        for i in range(0, len(users), QUERY_CHUNK_SIZE):
+            stored = DetectorState.objects.select_for_update().filter(user_id__in=users[i:i + QUERY_CHUNK_SIZE])
+            for user, state in stored.values_list("user_id", "state"):
+                new_as_of = snapshots[user].get("as_of")
+                if state.get("as_of") and new_as_of and pd.Timestamp(state["as_of"]) > pd.Timestamp(new_as_of):
+                    snapshots[user] = state
+
+        non_empty = [DetectorState(user_id=user, state=snapshot) for user, snapshot in snapshots.items() if snapshot]
+        empty = [user for user, snapshot in snapshots.items() if not snapshot]
+        for i in range(0, len(empty), QUERY_CHUNK_SIZE):
+            DetectorState.objects.filter(user_id__in=empty[i:i + QUERY_CHUNK_SIZE]).delete()
+        if non_empty:
+            DetectorState.objects.bulk_create(
+                non_empty,
+                update_conflicts=True,
+                unique_fields=["user_id"],
+                update_fields=["state", "updated_at"],
+            )
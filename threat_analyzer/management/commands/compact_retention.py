@@ -0,0 +1,102 @@
+"""
+Management command that enforces the retention policy on logs, threats and incidents.
+
+Usage:
+    python manage.py compact_retention
+    python manage.py compact_retention --log-days 30 --archive-dir archive/ --vacuum
+    python manage.py compact_retention --every 3600 --pause 0.05
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from threat_analyzer.retention import (
+    ARCHIVE_FORMATS,
+    RETENTION_TARGETS,
+    compact_model,
+    open_archive,
+    optimize_database,
+    retention_cutoff,
+)
+
+
+class Command(BaseCommand):
+    """
+    Deletes (and optionally archives) rows older than the retention policy in bounded batches.
+
+    The policy comes from settings.RETENTION_DAYS and can be overridden per run.
+    A value of None keeps the rows forever. With `--every`, the command keeps
+    running and compacts again after each interval.
+    """
+
+    help = "Delete or archive logs, threats and incidents older than the retention policy."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log-days', type=int, help="Retention of logs in days.")
+        parser.add_argument('--threat-days', type=int, help="Retention of threats in days.")
+        parser.add_argument('--incident-days', type=int, help="Retention of incidents in days.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Maximum rows deleted per transaction.")
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between batches to leave room for live ingest.")
+        parser.add_argument('--archive-dir', default=getattr(settings, 'RETENTION_ARCHIVE_DIR', None),
+                            help="Write removed rows to this directory before deleting them.")
+        parser.add_argument('--archive-format', choices=sorted(ARCHIVE_FORMATS), default='ndjson',
+                            help="Archive file format (parquet requires pyarrow).")
+        parser.add_argument('--vacuum', action='store_true',
+                            help="Run VACUUM after compacting (blocks writers while it runs).")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many rows are expired.")
+        parser.add_argument('--every', type=float,
+                            help="Keep running and compact again every EVERY seconds.")
+
+    def handle(self, *args, **options):
+        policy = dict(getattr(settings, 'RETENTION_DAYS', {}))
+        for key, option in (('logs', 'log_days'), ('threats', 'threat_days'), ('incidents', 'incident_days')):
+            if options[option] is not None:
+                policy[key] = options[option]
+
+        while True:
+            self.compact(policy, options)
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+    def compact(self, policy, options):
+        """
+        Runs one compaction pass over every retention target.
+        """
+        for key, model, field in RETENTION_TARGETS:
+            days = policy.get(key)
+            if days is None:
+                continue
+
+            archive = None
+            if options['archive_dir'] and not options['dry_run']:
+                try:
+                    archive = open_archive(options['archive_dir'], key, options['archive_format'], model)
+                except ImportError:
+                    raise CommandError("Parquet archives require pyarrow (pip install pyarrow).")
+
+            try:
+                rows, seconds = compact_model(
+                    model, field, retention_cutoff(days),
+                    batch_size=options['batch_size'], archive=archive,
+                    pause=options['pause'], dry_run=options['dry_run'],
+                )
+            finally:
+                if archive is not None:
+                    archive.close()
+
+            verb = "expired" if options['dry_run'] else "removed"
+            rate = rows / seconds if seconds > 0 else 0
+            line = f"{key}: {rows} rows older than {days} days {verb} in {seconds:.2f}s ({rate:.0f} rows/sec)"
+            if archive is not None and rows:
+                line += f", archived to {archive.path}"
+            self.stdout.write(line)
+
+        if not options['dry_run']:
+            started = time.perf_counter()
+            optimize_database(vacuum=options['vacuum'])
+            action = "VACUUM + ANALYZE" if options['vacuum'] else "ANALYZE"
+            self.stdout.write(f"{action} completed in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:14
+
+import log_ingestor.fields
+from log_ingestor.iputils import ip_key
+from django.db import migrations
+
+
+def backfill_ip_key(apps, schema_editor):
+    """
+    Populates ip_key for rows stored before the column existed.
+    """
+    Threat = apps.get_model('threat_analyzer', 'Threat')
+    batch = []
+    for row in Threat.objects.only('id', 'ip_address').iterator(chunk_size=2000):
+        row.ip_key = ip_key(row.ip_address)
+        batch.append(row)
+        if len(batch) >= 2000:
+            Threat.objects.bulk_update(batch, ['ip_key'])
+            batch = []
+    if batch:
+        Threat.objects.bulk_update(batch, ['ip_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threat_analyzer', '0002_detectorstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='threat',
+            name='ip_key',
+            field=log_ingestor.fields.IPKeyField(db_index=True, editable=False, max_length=32, null=True),
+        ),
+        migrations.RunPython(backfill_ip_key, migrations.RunPython.noop),
+    ]
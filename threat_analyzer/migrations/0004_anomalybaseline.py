@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threat_analyzer', '0003_threat_ip_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnomalyBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=100, unique=True)),
+                ('baseline', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:20
+
+import django.db.models.deletion
+import log_ingestor.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threat_analyzer', '0004_anomalybaseline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Incident',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('user_id', models.CharField(max_length=100)),
+                ('threat_type', models.CharField(max_length=100)),
+                ('ip_address', models.GenericIPAddressField()),
+                ('ip_key', log_ingestor.fields.IPKeyField(db_index=True, editable=False, max_length=32, null=True)),
+                ('severity', models.CharField(max_length=50)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField(db_index=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('sample_events', models.JSONField(default=list)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', 'threat_type', 'ip_address', 'last_seen'], name='incident_correlation_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='threat',
+            name='incident',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='threats', to='threat_analyzer.incident'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threat_analyzer', '0005_incident'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='threat',
+            index=models.Index(fields=['timestamp'], name='threat_timestamp_idx'),
+        ),
+    ]
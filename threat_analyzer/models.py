@@ -7,6 +7,57 @@ potential security threats detected in system logs.
 
 from django.db import models
 
+from log_ingestor.fields import IPKeyField
+
+class Incident(models.Model):
+    """
+    Model grouping correlated threats into a single incident.
+
+    Threats sharing the same user, threat type and IP address are merged into
+    one incident as long as each new threat occurs within the correlation gap
+    (settings.INCIDENT_CORRELATION_GAP_SECONDS) of the incident's last threat.
+
+    Attributes:
+        id (AutoField): Primary key for the incident record.
+        user_id (CharField): ID of the user associated with the threats.
+        threat_type (CharField): Category shared by the grouped threats.
+        ip_address (GenericIPAddressField): Source IP address shared by the grouped threats.
+        ip_key (IPKeyField): Indexed integer encoding of ip_address, used for CIDR and range queries.
+        severity (CharField): Highest severity among the grouped threats.
+        first_seen (DateTimeField): Timestamp of the earliest grouped threat.
+        last_seen (DateTimeField): Timestamp of the latest grouped threat.
+        count (PositiveIntegerField): Number of grouped threats.
+        sample_events (JSONField): The first few grouped threats (timestamp, action, file name).
+    """
+
+    id = models.AutoField(primary_key=True)  # Unique ID for each incident
+    user_id = models.CharField(max_length=100)  # Associated user ID
+    threat_type = models.CharField(max_length=100)  # Type shared by the grouped threats
+    ip_address = models.GenericIPAddressField()  # Source IP address
+    ip_key = IPKeyField()  # Derived from ip_address on save, indexed for CIDR/range lookups
+    severity = models.CharField(max_length=50)  # Highest severity of the grouped threats
+    first_seen = models.DateTimeField()  # Earliest grouped threat
+    last_seen = models.DateTimeField(db_index=True)  # Latest grouped threat
+    count = models.PositiveIntegerField(default=0)  # Number of grouped threats
+    sample_events = models.JSONField(default=list)  # A few grouped threats for context
+
+    class Meta:
+        indexes = [
+            # Lookup of the open incident for a (user, type, ip) key during correlation
+            models.Index(fields=['user_id', 'threat_type', 'ip_address', 'last_seen'],
+                         name='incident_correlation_idx'),
+        ]
+
+    def __str__(self):
+        """
+        String representation of an Incident instance.
+
+        Returns:
+            str: A readable format of the incident instance.
+        """
+        return f"[{self.threat_type}] {self.user_id} x{self.count} ({self.first_seen} - {self.last_seen})"
+
+
 class Threat(models.Model):
     """
     Model representing a detected security threat.
@@ -20,6 +71,8 @@ class Threat(models.Model):
         file_name (CharField): Name of the file accessed (if applicable).
         threat_type (CharField): Category of the detected threat (e.g., CredentialStuffing, DataExfiltration).
         severity (CharField): Severity level of the threat (e.g., Low, Medium, High).
+        ip_key (IPKeyField): Indexed integer encoding of ip_address, used for CIDR and range queries.
+        incident (ForeignKey, optional): Incident the threat was correlated into.
     """
 
     id = models.AutoField(primary_key=True)  # Unique ID for each threat
@@ -30,6 +83,15 @@ class Threat(models.Model):
     file_name = models.CharField(max_length=255, null=True, blank=True)  # Optional file name
     threat_type = models.CharField(max_length=100)  # Type of detected threat
     severity = models.CharField(max_length=50)  # Threat severity level (Low, Medium, High)
+    ip_key = IPKeyField()  # Derived from ip_address on save, indexed for CIDR/range lookups
+    incident = models.ForeignKey(Incident, null=True, blank=True, on_delete=models.SET_NULL,
+                                 related_name='threats')  # Correlated incident
+
+    class Meta:
+        indexes = [
+            # Expired-row lookups of retention compaction (threat_analyzer.retention)
+            models.Index(fields=['timestamp'], name='threat_timestamp_idx'),
+        ]
 
     def __str__(self):
         """
@@ -39,3 +101,56 @@ class Threat(models.Model):
             str: A readable format of the threat instance.
         """
         return f"[{self.threat_type}] {self.user_id} - {self.severity}"
+
+
+class DetectorState(models.Model):
+    """
+    Model storing the rule-engine state carried over between analyze calls.
+
+    `detect_threats` keeps per-user trackers (recent login failures, the last
+    seen IP and recent restricted file reads). Persisting a pruned snapshot of
+    them lets an attack that spans two consecutive log files be detected
+    without re-analyzing the earlier file.
+
+    Attributes:
+        user_id (CharField): User the snapshot belongs to (unique).
+        state (JSONField): Compact snapshot produced by `detector_state.snapshot_trackers`.
+        updated_at (DateTimeField): When the snapshot was last written.
+    """
+
+    user_id = models.CharField(max_length=100, unique=True)  # One snapshot per user
+    state = models.JSONField(default=dict)  # Serialized tracker entries for this user
+    updated_at = models.DateTimeField(auto_now=True)  # Last time the snapshot was persisted
+
+    def __str__(self):
+        """
+        String representation of a DetectorState instance.
+
+        Returns:
+            str: The user and the time of the last update.
+        """
+        return f"[DetectorState] {self.user_id} @ {self.updated_at}"
+
+
+class AnomalyBaseline(models.Model):
+    """
+    Model storing the per-user baseline of the statistical anomaly detection engine.
+
+    Attributes:
+        user_id (CharField): User the baseline belongs to (unique).
+        baseline (JSONField): Serialized `anomaly_detection.Baseline`.
+        updated_at (DateTimeField): When the baseline was last written.
+    """
+
+    user_id = models.CharField(max_length=100, unique=True)  # One baseline per user
+    baseline = models.JSONField(default=dict)  # Moving averages and recent IPs/files of the user
+    updated_at = models.DateTimeField(auto_now=True)  # Last time the baseline was persisted
+
+    def __str__(self):
+        """
+        String representation of an AnomalyBaseline instance.
+
+        Returns:
+            str: The user and the time of the last update.
+        """
+        return f"[AnomalyBaseline] {self.user_id} @ {self.updated_at}"
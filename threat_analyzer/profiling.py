@@ -0,0 +1,225 @@
+"""
+Opt-in profiling of the threat analysis pipeline.
+
+`ThreatAnalyzeView` wraps each pipeline stage (CSV parsing, timestamp
+preparation, the rule loop, anomaly detection, correlation, bulk inserts and
+JSON rendering) in `PipelineProfiler.stage`, which records wall time, CPU time and rows/sec,
+and optionally the peak memory allocated (tracemalloc). Inside the rule loop of
+`detect_threats`, `PipelineProfiler.tick` attributes the time spent between
+two ticks to a rule, so slow rules show up individually. A cProfile dump can
+be written for offline analysis with `pstats` or snakeviz.
+
+Profiling is requested per call with the `X-Profile` header or the `profile`
+query parameter and only honoured when settings.ANALYZE_PROFILING_ENABLED is
+set:
+
+- "1" reports timings only, with no tracing overhead;
+- "memory" also traces allocations with tracemalloc, which slows Python code
+  several times over, so the timings of that report are not representative;
+- "cprofile" also dumps pstats into settings.ANALYZE_PROFILING_DIR (required),
+  with cProfile's own overhead on the timings.
+
+tracemalloc and cProfile are process-wide, so only one request traces at a
+time; a concurrent memory/cprofile request falls back to timings only and says
+so in its report. When profiling is off, `NULL_PROFILER` is used and every hook
+is a no-op, and `detect_threats` skips the per-rule ticks entirely.
+"""
+
+import cProfile
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework import serializers
+
+# Values of the header / query parameter that turn profiling on
+PROFILE_REPORT_VALUES = {"1", "true", "yes", "report"}
+PROFILE_MEMORY_VALUES = {"memory", "tracemalloc"}
+PROFILE_CPROFILE_VALUES = {"cprofile", "pstats"}
+
+# Held while a request runs tracemalloc or cProfile, which are process-wide
+_TRACING_LOCK = threading.Lock()
+
+
+class PipelineProfiler:
+    """
+    Collects per-stage and per-rule measurements for one analyze request.
+    """
+
+    enabled = True
+
+    def __init__(self, cprofile=False, memory=False):
+        self.memory = memory
+        self.stages = []
+        self.rule_time = defaultdict(float)
+        self.rule_hits = defaultdict(int)
+        self.profile = cProfile.Profile() if cprofile else None
+        self.pstats_file = None
+        self.notes = []
+        self._holds_tracing_lock = False
+        self._started_tracing = False
+        self._last_tick = None
+        self._started = None
+
+    def start(self):
+        """
+        Starts memory tracing and cProfile, if requested and no other request is tracing.
+        """
+        if self.memory or self.profile is not None:
+            self._holds_tracing_lock = _TRACING_LOCK.acquire(blocking=False)
+            if not self._holds_tracing_lock:
+                self.memory = False
+                self.profile = None
+                self.notes.append("Another request was being traced; only timings were collected.")
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._started = time.perf_counter()
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self):
+        """
+        Stops cProfile and the memory tracing started by `start`.
+        """
+        if self.profile is not None:
+            self.profile.disable()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        if self._holds_tracing_lock:
+            _TRACING_LOCK.release()
+            self._holds_tracing_lock = False
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Measures a pipeline stage.
+
+        Yields a dictionary in which the stage can set "rows" once the number of
+        processed rows is known. "peak_memory_kb" is only measured in memory mode.
+        """
+        record = {"stage": name, "rows": rows}
+        if self.memory:
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            peak = tracemalloc.get_traced_memory()[1] - memory_before if self.memory else None
+            record.update({
+                "wall_ms": round(wall * 1000, 3),
+                "cpu_ms": round(cpu * 1000, 3),
+                "peak_memory_kb": round(max(peak, 0) / 1024, 1) if peak is not None else None,
+                "rows_per_sec": round(record["rows"] / wall) if record["rows"] and wall > 0 else None,
+            })
+            self.stages.append(record)
+
+    def tick(self, rule=None):
+        """
+        Attributes the time since the previous tick to `rule`; `None` only resets the clock.
+        """
+        now = time.perf_counter()
+        if rule is not None:
+            self.rule_time[rule] += now - self._last_tick
+        self._last_tick = now
+
+    def count_hits(self, threats):
+        """
+        Counts the threats produced per rule (threat type).
+        """
+        for threat in threats:
+            self.rule_hits[threat.threat_type] += 1
+
+    def dump_stats(self, directory):
+        """
+        Writes the cProfile data to `directory` and returns the file path.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"analyze-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.pstats")
+        self.profile.dump_stats(path)
+        self.pstats_file = path
+        return path
+
+    def report(self):
+        """
+        Returns the collected measurements as a JSON-compatible dictionary.
+        """
+        rules = sorted(set(self.rule_time) | set(self.rule_hits))
+        tracers = [name for name, active in (("tracemalloc", self.memory), ("cProfile", self.profile is not None))
+                   if active]
+        return {
+            "mode": "+".join(["timing"] + tracers),
+            "timing_note": (f"Times were measured under {' and '.join(tracers)} and are inflated; "
+                            "use X-Profile: 1 for representative timings.") if tracers else None,
+            "total_wall_ms": round((time.perf_counter() - self._started) * 1000, 3) if self._started else None,
+            "stages": self.stages,
+            "rules": {
+                rule: {
+                    # Threats from the anomaly engine are counted but not timed per rule
+                    "wall_ms": round(self.rule_time[rule] * 1000, 3) if rule in self.rule_time else None,
+                    "hits": self.rule_hits.get(rule, 0),
+                }
+                for rule in rules
+            },
+            "pstats_file": self.pstats_file,
+            "notes": self.notes,
+        }
+
+
+class NullProfiler:
+    """
+    Profiler stand-in used when profiling is off; every hook does nothing.
+    """
+
+    enabled = False
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        yield {}
+
+    def tick(self, rule=None):
+        pass
+
+    def count_hits(self, threats):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def profiler_for_request(request):
+    """
+    Returns the profiler requested by an analyze call, or `NULL_PROFILER`.
+
+    Args:
+        request: The DRF request; profiling is asked for with the `X-Profile` header
+                 or the `profile` query parameter.
+
+    Returns:
+        PipelineProfiler | NullProfiler: The profiler to thread through the pipeline.
+
+    Raises:
+        serializers.ValidationError: If cProfile output is requested without
+                                     settings.ANALYZE_PROFILING_DIR to write it to.
+    """
+    if not getattr(settings, 'ANALYZE_PROFILING_ENABLED', False):
+        return NULL_PROFILER
+    value = (request.headers.get('X-Profile') or request.query_params.get('profile') or '').lower()
+    if value in PROFILE_CPROFILE_VALUES:
+        if not getattr(settings, 'ANALYZE_PROFILING_DIR', None):
+            raise serializers.ValidationError({'error': 'cProfile output requires ANALYZE_PROFILING_DIR to be set'})
+        return PipelineProfiler(cprofile=True)
+    if value in PROFILE_MEMORY_VALUES:
+        return PipelineProfiler(memory=True)
+    if value in PROFILE_REPORT_VALUES:
+        return PipelineProfiler()
+    return NULL_PROFILER
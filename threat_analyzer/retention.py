@@ -0,0 +1,222 @@
+"""
+Retention compaction for logs, threats and incidents.
+
+Rows older than the retention policy are deleted (optionally after being
+archived) in bounded batches. Each batch selects at most `batch_size` expired
+rows after the last primary key handled (keyset pagination, so gaps in the id
+sequence cost nothing) and runs in its own short transaction, so compaction
+never holds long locks and can run next to live ingest. Archives are written
+as gzip-compressed NDJSON or, when pyarrow is installed, as a directory of
+Parquet files (one per batch) with a schema derived from the model.
+"""
+
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from log_ingestor.models import Log
+from threat_analyzer.models import Incident, Threat
+
+# (policy key, model, age field)
+# Threats are compacted before incidents so that incident deletes have few links to clear.
+RETENTION_TARGETS = [
+    ("logs", Log, "timestamp"),
+    ("threats", Threat, "timestamp"),
+    ("incidents", Incident, "last_seen"),
+]
+
+
+class NDJSONArchive:
+    """
+    Gzip-compressed newline-delimited JSON archive, created on the first write.
+    """
+
+    extension = "ndjson.gz"
+
+    def __init__(self, path, model):
+        self.path = path
+        self.handle = None
+
+    def write(self, rows):
+        if self.handle is None:
+            self.handle = gzip.open(self.path, "wt", encoding="utf-8")
+        for row in rows:
+            self.handle.write(json.dumps(row, cls=DjangoJSONEncoder))
+            self.handle.write("\n")
+        self.handle.flush()
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+
+
+class ParquetArchive:
+    """
+    Parquet dataset directory holding one finished file per batch (requires pyarrow), created on the first write.
+
+    Parquet files are only readable once their footer is written, so each batch
+    is written to a complete `part-NNNNN.parquet` file (renamed into place when
+    done) before its rows are deleted. A run killed part way leaves readable
+    parts for every batch that was deleted. The directory reads back as one
+    table with `pyarrow.parquet.read_table(path)`.
+
+    The schema is derived from the model fields rather than inferred from the
+    first batch, so a column that is entirely NULL in early batches (e.g.
+    `Threat.incident_id` on threats stored before incidents existed) keeps its type.
+    JSON fields are stored as JSON text.
+    """
+
+    extension = "parquet"
+
+    def __init__(self, path, model):
+        self.path = path
+        self.schema, self.json_columns = arrow_schema(model)  # Imports pyarrow before anything is deleted
+        self.parts = 0
+
+    def write(self, rows):
+        import pyarrow
+        import pyarrow.parquet
+
+        if self.json_columns:
+            rows = [{**row, **{name: json.dumps(row[name], cls=DjangoJSONEncoder) for name in self.json_columns
+                               if row[name] is not None}} for row in rows]
+        table = pyarrow.Table.from_pylist(rows, schema=self.schema)
+        os.makedirs(self.path, exist_ok=True)
+        part = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+        pyarrow.parquet.write_table(table, f"{part}.tmp", compression="zstd")
+        os.replace(f"{part}.tmp", part)
+        self.parts += 1
+
+    def close(self):
+        pass
+
+
+ARCHIVE_FORMATS = {"ndjson": NDJSONArchive, "parquet": ParquetArchive}
+
+
+def arrow_schema(model):
+    """
+    Builds the pyarrow schema of the rows returned by `model.objects.values()`.
+
+    Returns:
+        tuple: `(schema, json_columns)`, the names of JSON fields being stored as text.
+    """
+    import pyarrow
+
+    integer = pyarrow.int64()
+    types = {
+        "AutoField": integer, "BigAutoField": integer, "SmallAutoField": integer,
+        "IntegerField": integer, "BigIntegerField": integer, "SmallIntegerField": integer,
+        "PositiveIntegerField": integer, "PositiveBigIntegerField": integer, "PositiveSmallIntegerField": integer,
+        "BooleanField": pyarrow.bool_(),
+        "FloatField": pyarrow.float64(),
+        "DateField": pyarrow.date32(),
+        "DateTimeField": pyarrow.timestamp("us", tz="UTC"),
+    }
+    fields = []
+    json_columns = []
+    for field in model._meta.concrete_fields:
+        internal_type = (field.target_field if field.is_relation else field).get_internal_type()
+        if internal_type == "JSONField":
+            json_columns.append(field.attname)
+        fields.append(pyarrow.field(field.attname, types.get(internal_type, pyarrow.string()), nullable=True))
+    return pyarrow.schema(fields), json_columns
+
+
+def open_archive(directory, name, archive_format, model):
+    """
+    Prepares the archive file for one model in `directory`.
+
+    Raises:
+        ImportError: If the Parquet format is requested without pyarrow installed.
+    """
+    archive_class = ARCHIVE_FORMATS[archive_format]
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.{archive_class.extension}")
+    return archive_class(path, model)
+
+
+def compact_model(model, field, cutoff, batch_size=5000, archive=None, pause=0.0, dry_run=False):
+    """
+    Deletes rows of `model` whose `field` is older than `cutoff`, at most `batch_size` rows at a time.
+
+    Batches walk the expired rows in primary-key order, each starting after the
+    last key of the previous one. The walk is bounded by the lowest and highest
+    expired keys, looked up once through the index on `field`, so it never
+    scans the live rows past the last expired one.
+
+    Args:
+        model: Model class to compact.
+        field (str): Date/time field compared with `cutoff`.
+        cutoff (datetime): Rows strictly older than this are removed.
+        batch_size (int): Maximum number of rows deleted per transaction.
+        archive (NDJSONArchive | ParquetArchive, optional): Receives the rows before they are deleted.
+        pause (float): Seconds to sleep between batches, leaving room for concurrent writers.
+        dry_run (bool): Only count the expired rows.
+
+    Returns:
+        tuple: `(rows, seconds)` removed (or counted) and time spent.
+    """
+    started = time.perf_counter()
+    expired = model.objects.filter(**{f"{field}__lt": cutoff}).order_by("pk")
+    if dry_run:
+        return expired.count(), time.perf_counter() - started
+
+    bounds = expired.aggregate(first=Min("pk"), last=Max("pk"))
+    if bounds["first"] is None:
+        return 0, time.perf_counter() - started
+    expired = expired.filter(pk__range=(bounds["first"], bounds["last"]))
+
+    pk_name = model._meta.pk.attname
+    removed = 0
+    last_pk = None
+    while True:
+        batch = expired if last_pk is None else expired.filter(pk__gt=last_pk)
+        with transaction.atomic():
+            if archive is not None:
+                rows = list(batch.values()[:batch_size])
+                ids = [row[pk_name] for row in rows]
+                if rows:
+                    archive.write(rows)
+            else:
+                ids = list(batch.values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            removed += model.objects.filter(pk__in=ids).delete()[1].get(model._meta.label, 0)
+        last_pk = ids[-1]
+
+        if len(ids) < batch_size:
+            break  # That was the last expired row
+        if pause:
+            time.sleep(pause)
+
+    return removed, time.perf_counter() - started
+
+
+def optimize_database(vacuum=False):
+    """
+    Refreshes planner statistics and, if requested, reclaims free space.
+
+    On SQLite, `vacuum` also merges the segments of the log full-text index.
+    VACUUM rewrites the whole database file and blocks writers while it runs.
+    """
+    with connection.cursor() as cursor:
+        if vacuum and connection.vendor == "sqlite" and "log_ingestor_log_fts" in connection.introspection.table_names():
+            cursor.execute("INSERT INTO log_ingestor_log_fts(log_ingestor_log_fts) VALUES ('optimize')")
+        if vacuum:
+            cursor.execute("VACUUM")
+        cursor.execute("ANALYZE")
+
+
+def retention_cutoff(days):
+    """
+    Returns the datetime before which rows exceed a retention of `days` days.
+    """
+    return timezone.now() - timedelta(days=days)
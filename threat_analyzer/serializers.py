@@ -1,12 +1,12 @@
 """
 Serializer for the Threat model.
 
-This module defines the ThreatSerializer class, which is responsible for 
-converting Threat model instances to JSON format and vice versa.
+This module defines the ThreatSerializer and IncidentSerializer classes, which are
+responsible for converting Threat and Incident model instances to JSON format and vice versa.
 """
 
 from rest_framework import serializers
-from threat_analyzer.models import Threat
+from threat_analyzer.models import Incident, Threat
 
 class ThreatSerializer(serializers.ModelSerializer):
     """
@@ -17,9 +17,23 @@ class ThreatSerializer(serializers.ModelSerializer):
 
     Meta:
         model (Threat): The model associated with this serializer.
-        fields (str): Specifies that all model fields should be included.
+        exclude (list): Hides the internal `ip_key` sort key; every other field is included.
     """
 
     class Meta:
         model = Threat  # Specify the model to serialize
-        fields = '__all__'  # Include all fields in serialization
+        exclude = ['ip_key']  # Internal IP range key, not part of the API
+
+
+class IncidentSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the Incident model.
+
+    Meta:
+        model (Incident): The model associated with this serializer.
+        exclude (list): Hides the internal `ip_key` sort key; every other field is included.
+    """
+
+    class Meta:
+        model = Incident  # Specify the model to serialize
+        exclude = ['ip_key']  # Internal IP range key, not part of the API
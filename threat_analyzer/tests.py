@@ -1,3 +1,377 @@
-from django.test import TestCase
+"""
+Tests for the threat analysis pipeline: incremental detector state, the
+anomaly engine, incident correlation and retention compaction.
+"""
 
-# Create your tests here.
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from log_ingestor.models import Log
+
+from threat_analyzer.anomaly_detection import AnomalyDetector, Baseline
+from threat_analyzer.correlation import correlate_threats
+from threat_analyzer.models import DetectorState, Incident, Threat
+from threat_analyzer.profiling import _TRACING_LOCK
+from threat_analyzer.retention import compact_model, open_archive
+from threat_analyzer.serializers import IncidentSerializer, ThreatSerializer
+
+CSV_COLUMNS = ["timestamp", "user_id", "ip_address", "action", "file_name", "database_query"]
+
+
+def make_csv(rows):
+    """
+    Renders log rows (tuples in CSV_COLUMNS order) as an uploaded CSV file.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    writer.writerows(rows)
+    return SimpleUploadedFile("logs.csv", buffer.getvalue().encode(), content_type="text/csv")
+
+
+def synthetic_logs(count, seed=7):
+    """
+    Generates `count` log rows with strictly increasing timestamps that exercise every rule.
+    """
+    rng = random.Random(seed)
+    users = ["42", "7", "admin42", "guest99"]
+    ips = ["10.0.0.1", "10.0.0.2", "192.168.1.20"]
+    files = ["/secure/payroll.csv", "/confidential/design.pdf", "/db_dump.sql", "/reports/q1.pdf", ""]
+    timestamp = datetime(2025, 3, 26, 0, 0)
+    rows = []
+    for _ in range(count):
+        timestamp += timedelta(seconds=rng.randint(1, 90))
+        action = rng.choice(["login_failed", "login_failed", "login_success", "database_query", "file_access"])
+        query = rng.choice(["INSERT INTO t VALUES (1)", "DELETE FROM t", "SELECT 1"]) if action == "database_query" else ""
+        rows.append((timestamp.isoformat(sep=" "), rng.choice(users), rng.choice(ips), action,
+                     rng.choice(files), query))
+    return rows
+
+
+def threat_keys(response):
+    """
+    Returns the detected threats of an analyze response as a multiset of `(timestamp, user, type)`.
+    """
+    return Counter((threat["timestamp"], str(threat["user_id"]), threat["threat_type"])
+                   for threat in response.json()["threats"].values())
+
+
+@override_settings(ANOMALY_DETECTION_ENABLED=False)
+class IncrementalDetectionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def analyze(self, rows, incremental=True):
+        url = "/api/threats/analyze" + ("" if incremental else "?incremental=false")
+        response = self.client.post(url, {"file": make_csv(rows)}, format="multipart")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_state_carries_over_for_numeric_user_ids(self):
+        self.analyze([(f"2025-03-26 10:0{i}:00", "42", "10.0.0.1", "login_failed", "", "") for i in range(3)])
+        self.assertTrue(DetectorState.objects.filter(user_id="42").exists())
+
+        response = self.analyze([("2025-03-26 10:05:00", "42", "10.0.0.1", "login_success", "", "")])
+        self.assertEqual(threat_keys(response), Counter({("2025-03-26T10:05:00", "42", "CredentialStuffing"): 1}))
+
+    def test_split_uploads_match_single_upload(self):
+        rows = synthetic_logs(600)
+        expected = threat_keys(self.analyze(rows, incremental=False))
+        self.assertTrue(expected)
+
+        found = Counter()
+        for start, end in [(0, 150), (150, 151), (151, 420), (420, 600)]:
+            found += threat_keys(self.analyze(rows[start:end]))
+        self.assertEqual(found, expected)
+
+    def test_newer_state_does_not_match_older_upload(self):
+        self.analyze([
+            ("2025-03-26 10:00:00", "admin42", "10.0.0.1", "login_failed", "", ""),
+            ("2025-03-26 10:00:30", "admin42", "10.0.0.1", "file_access", "/secure/payroll.csv", ""),
+        ])
+        response = self.analyze([
+            ("2025-03-26 09:59:00", "admin42", "10.0.0.2", "file_access", "/secure/payroll.csv", ""),
+            ("2025-03-26 09:59:30", "admin42", "10.0.0.2", "database_query", "", "DELETE FROM t"),
+        ])
+        types = {threat_type for _, _, threat_type in threat_keys(response)}
+        self.assertNotIn("PrivilegeEscalation", types)
+        self.assertNotIn("AccountTakeover", types)
+        # The older upload does not roll the stored state back
+        self.assertEqual(DetectorState.objects.get(user_id="admin42").state["last_seen"],
+                         ["2025-03-26T10:00:30", "10.0.0.1"])
+
+        self.analyze([(f"2025-03-26 10:0{i}:00", "42", "10.0.0.1", "login_failed", "", "") for i in range(3)])
+        response = self.analyze([("2025-03-26 09:00:00", "42", "10.0.0.1", "login_success", "", "")])
+        self.assertEqual(threat_keys(response), Counter())
+
+    def test_reuploading_a_file_finds_no_new_credential_stuffing(self):
+        rows = [("2025-03-26 10:00:00", "42", "10.0.0.1", "login_success", "", "")]
+        rows += [(f"2025-03-26 10:0{i}:00", "42", "10.0.0.1", "login_failed", "", "") for i in range(1, 4)]
+        self.assertEqual(threat_keys(self.analyze(rows)), Counter())
+        self.assertEqual(threat_keys(self.analyze(rows)), Counter())
+
+
+class SerializerTests(TestCase):
+    def test_ip_key_is_not_exposed(self):
+        threat = Threat.objects.create(timestamp=datetime(2025, 3, 26, 10, 0), user_id="42", ip_address="10.0.0.1",
+                                       action="login_success", threat_type="CredentialStuffing", severity="High")
+        incident = Incident.objects.create(user_id="42", threat_type="CredentialStuffing", ip_address="10.0.0.1",
+                                           severity="High", first_seen=threat.timestamp, last_seen=threat.timestamp,
+                                           count=1, sample_events=[])
+        self.assertNotIn("ip_key", ThreatSerializer(threat).data)
+        self.assertNotIn("ip_key", IncidentSerializer(incident).data)
+
+
+def anomaly_logs(count, seed=11):
+    """
+    Builds a log DataFrame for 3 users cycling through more IPs and files than the baselines track.
+    """
+    rng = random.Random(seed)
+    timestamp = datetime(2025, 3, 26, 0, 0)
+    rows = []
+    for _ in range(count):
+        timestamp += timedelta(seconds=rng.choice([1, 5, 30, 120, 600]))
+        rows.append({
+            "timestamp": timestamp,
+            "user_id": rng.choice(["42", "admin42", "guest99"]),
+            "ip_address": f"10.0.{rng.randrange(2)}.{rng.randrange(150)}",
+            "action": "file_access",
+            "file_name": rng.choice([f"/share/doc{rng.randrange(100)}.pdf", ""]),
+        })
+    return pd.DataFrame(rows)
+
+
+def anomaly_keys(threats):
+    return Counter((threat.timestamp, threat.user_id, threat.ip_address, threat.file_name, threat.threat_type)
+                   for threat in threats)
+
+
+class AnomalyDetectionTests(TestCase):
+    def test_batch_matches_streaming(self):
+        logs = anomaly_logs(5000)
+        streaming = AnomalyDetector()
+        expected = []
+        for row in logs.itertuples(index=False):
+            expected += streaming.observe(row.user_id, row.timestamp, row.ip_address, row.action, row.file_name)
+
+        batch = AnomalyDetector()
+        found = batch.observe_batch(logs)
+
+        types = Counter(threat.threat_type for threat in found)
+        self.assertTrue(types["UnusualIP"] and types["UnusualFileAccess"] and types["ActivitySpike"], types)
+        self.assertEqual(anomaly_keys(found), anomaly_keys(expected))
+        self.assertEqual({user: b.to_dict() for user, b in batch.baselines.items()},
+                         {user: b.to_dict() for user, b in streaming.baselines.items()})
+
+    def test_split_batches_match_single_batch(self):
+        logs = anomaly_logs(3000, seed=3)
+        expected = AnomalyDetector().observe_batch(logs)
+
+        detector = AnomalyDetector()
+        found = []
+        for start, end in [(0, 700), (700, 701), (701, 2200), (2200, 3000)]:
+            # Round-trip the baselines through their JSON form, as load_baselines/save_baselines do
+            detector = AnomalyDetector({user: Baseline.from_dict(b.to_dict()) for user, b in detector.baselines.items()})
+            found += detector.observe_batch(logs.iloc[start:end])
+        self.assertEqual(anomaly_keys(found), anomaly_keys(expected))
+
+
+def make_threat(minute, user="42", threat_type="CredentialStuffing", ip="10.0.0.1", severity="High"):
+    return Threat(timestamp=datetime(2025, 3, 26, 10, 0) + timedelta(minutes=minute), user_id=user, ip_address=ip,
+                  action="login_success", file_name=None, threat_type=threat_type, severity=severity)
+
+
+@override_settings(INCIDENT_CORRELATION_GAP_SECONDS=900)
+class CorrelationTests(TestCase):
+    def correlate(self, threats):
+        incidents = correlate_threats(threats)
+        Threat.objects.bulk_create(threats)
+        return incidents
+
+    def test_threats_within_gap_form_one_incident(self):
+        self.correlate([make_threat(0, severity="Medium"), make_threat(10), make_threat(20, ip="10.0.0.2"),
+                        make_threat(45)])
+
+        incidents = Incident.objects.order_by("first_seen", "ip_address")
+        self.assertEqual([(i.ip_address, i.count) for i in incidents], [("10.0.0.1", 2), ("10.0.0.2", 1), ("10.0.0.1", 1)])
+        self.assertEqual(incidents[0].severity, "High")
+        self.assertEqual(incidents[0].threats.count(), 2)
+
+    def test_later_batches_extend_incidents_in_either_direction(self):
+        self.correlate([make_threat(30)])
+        self.correlate([make_threat(40), make_threat(20)])
+        self.correlate([make_threat(55)])
+
+        incident = Incident.objects.get()
+        self.assertEqual(incident.count, 4)
+        self.assertEqual((incident.first_seen.minute, incident.last_seen.minute), (20, 55))
+        self.assertEqual(len(incident.sample_events), 4)
+
+    def test_late_threat_joins_the_incident_it_falls_into(self):
+        self.correlate([make_threat(0), make_threat(50)])
+        self.correlate([make_threat(12)])
+
+        self.assertEqual(sorted(Incident.objects.values_list("count", flat=True)), [1, 2])
+        self.assertEqual(Incident.objects.get(count=2).last_seen.minute, 12)
+
+    def test_split_batches_match_single_batch(self):
+        minutes = [0, 3, 12, 14, 50, 80, 81, 200, 215]
+        self.correlate([make_threat(m, user=str(m % 2)) for m in minutes])
+        single = sorted(Incident.objects.values_list("user_id", "first_seen", "last_seen", "count"))
+
+        Threat.objects.all().delete()
+        Incident.objects.all().delete()
+        for chunk in (minutes[:3], minutes[3:7], minutes[7:]):
+            self.correlate([make_threat(m, user=str(m % 2)) for m in chunk])
+        self.assertEqual(sorted(Incident.objects.values_list("user_id", "first_seen", "last_seen", "count")), single)
+
+    def test_invalid_integer_params_are_rejected(self):
+        self.correlate([make_threat(0), make_threat(5)])
+        incident = Incident.objects.get()
+        client = APIClient()
+
+        self.assertEqual(client.get("/api/threats/search?incident=abc").status_code, 400)
+        self.assertEqual(client.get("/api/incidents/search?min_count=abc").status_code, 400)
+        self.assertEqual(len(client.get(f"/api/threats/search?incident={incident.pk}").json()), 2)
+        self.assertEqual(len(client.get("/api/incidents/search?min_count=2").json()), 1)
+        self.assertEqual(len(client.get("/api/incidents/search?min_count=3").json()), 0)
+
+
+@override_settings(ANALYZE_PROFILING_ENABLED=True, ANALYZE_PROFILING_DIR=None)
+class ProfilingTests(TestCase):
+    def profile(self, mode):
+        response = APIClient().post("/api/threats/analyze?incremental=false", {"file": make_csv(synthetic_logs(50))},
+                                    format="multipart", HTTP_X_PROFILE=mode)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["profile"]
+
+    def test_timing_mode_does_not_trace_memory(self):
+        profile = self.profile("1")
+        self.assertEqual(profile["mode"], "timing")
+        self.assertIsNone(profile["timing_note"])
+        self.assertTrue(all(stage["peak_memory_kb"] is None for stage in profile["stages"]))
+
+    def test_memory_mode_reports_peaks_and_flags_timings(self):
+        profile = self.profile("memory")
+        self.assertEqual(profile["mode"], "timing+tracemalloc")
+        self.assertIn("tracemalloc", profile["timing_note"])
+        self.assertTrue(all(stage["peak_memory_kb"] is not None for stage in profile["stages"]))
+
+    def test_cprofile_requires_a_directory(self):
+        response = APIClient().post("/api/threats/analyze", {"file": make_csv(synthetic_logs(5))},
+                                    format="multipart", HTTP_X_PROFILE="cprofile")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ANALYZE_PROFILING_DIR", response.json()["error"])
+        self.assertFalse(Threat.objects.exists())
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(ANALYZE_PROFILING_DIR=directory):
+            profile = self.profile("cprofile")
+        self.assertEqual(profile["mode"], "timing+cProfile")
+        self.assertTrue(os.path.exists(profile["pstats_file"]))
+
+    def test_only_one_request_traces_at_a_time(self):
+        self.assertTrue(_TRACING_LOCK.acquire(blocking=False))
+        try:
+            profile = self.profile("memory")
+        finally:
+            _TRACING_LOCK.release()
+        self.assertEqual(profile["mode"], "timing")
+        self.assertEqual(len(profile["notes"]), 1)
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(self.profile("memory")["mode"], "timing+tracemalloc")
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.old = timezone.now() - timedelta(days=400)
+
+    def tearDown(self):
+        shutil.rmtree(self.archive_dir)
+
+    def make_logs(self, count):
+        return Log.objects.bulk_create([Log(user_id=f"u{i}", ip_address="10.0.0.1", action="login_success")
+                                        for i in range(count)])
+
+    def test_gaps_in_primary_keys_do_not_stop_the_sweep(self):
+        logs = self.make_logs(30)
+        Log.objects.filter(pk__in=[log.pk for log in logs[5:15]]).delete()  # 10-id gap
+        Log.objects.filter(pk__in=[log.pk for log in logs[:25]]).update(timestamp=self.old)
+
+        removed, _ = compact_model(Log, "timestamp", timezone.now() - timedelta(days=90), batch_size=5)
+        self.assertEqual(removed, 15)
+        self.assertEqual(list(Log.objects.values_list("pk", flat=True)), [log.pk for log in logs[25:]])
+
+    def test_archive_then_delete(self):
+        logs = self.make_logs(12)
+        Log.objects.filter(pk__in=[log.pk for log in logs[:7]]).update(timestamp=self.old)
+        expected = list(Log.objects.filter(timestamp=self.old).values_list("pk", "user_id"))
+
+        archive = open_archive(self.archive_dir, "logs", "ndjson", Log)
+        removed, _ = compact_model(Log, "timestamp", timezone.now() - timedelta(days=90), batch_size=3, archive=archive)
+        archive.close()
+
+        with gzip.open(archive.path, "rt") as handle:
+            archived = [json.loads(line) for line in handle]
+        self.assertEqual(removed, 7)
+        self.assertEqual([(row["id"], row["user_id"]) for row in archived], expected)
+        self.assertEqual(Log.objects.count(), 5)
+
+    def test_parquet_schema_does_not_depend_on_first_batch(self):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+        incident = Incident.objects.create(user_id="42", threat_type="CredentialStuffing", ip_address="10.0.0.1",
+                                           severity="High", first_seen=self.old, last_seen=self.old, count=3,
+                                           sample_events=[{"action": "login_success"}])
+        # The first batch of 3 has no incident links at all, the second one does
+        for minute in range(6):
+            Threat.objects.create(timestamp=self.old + timedelta(minutes=minute), user_id="42", ip_address="10.0.0.1",
+                                  action="login_success", threat_type="CredentialStuffing", severity="High",
+                                  incident=incident if minute >= 3 else None)
+
+        cutoff = timezone.now() - timedelta(days=90)
+        tables = {}
+        for key, model, field in [("threats", Threat, "timestamp"), ("incidents", Incident, "last_seen")]:
+            archive = open_archive(self.archive_dir, key, "parquet", model)
+            compact_model(model, field, cutoff, batch_size=3, archive=archive)
+            archive.close()
+            tables[key] = pyarrow.parquet.read_table(archive.path).to_pylist()
+
+            if key == "threats":
+                # Each batch is a finished file of its own
+                self.assertEqual(sorted(os.listdir(archive.path)), ["part-00000.parquet", "part-00001.parquet"])
+
+        self.assertEqual([row["incident_id"] for row in tables["threats"]], [None] * 3 + [incident.pk] * 3)
+        self.assertEqual(json.loads(tables["incidents"][0]["sample_events"]), [{"action": "login_success"}])
+        self.assertFalse(Threat.objects.exists() or Incident.objects.exists())
+
+    def test_command_reports_rates(self):
+        logs = self.make_logs(4)
+        Log.objects.filter(pk=logs[0].pk).update(timestamp=self.old)
+        output = io.StringIO()
+        call_command("compact_retention", "--archive-dir", self.archive_dir, stdout=output)
+
+        self.assertIn("logs: 1 rows older than 90 days removed", output.getvalue())
+        self.assertIn("rows/sec", output.getvalue())
+        self.assertEqual(len(os.listdir(self.archive_dir)), 1)  # Nothing to archive for threats/incidents
+        self.assertEqual(Log.objects.count(), 3)
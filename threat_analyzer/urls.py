@@ -10,11 +10,21 @@ URL patterns:
 - `api/threats`: List all threats (GET request). Handled by `ThreatAnalyzeView`.
 - `api/threats/<int:pk>`: Retrieve detailed information for a specific threat identified by its primary key (GET request). Handled by `ThreatDetailView`.
 - `api/threats/search`: Search for threats based on specified parameters (GET request). Handled by `ThreatSearchView`.
+- `api/incidents`: List incidents of correlated threats (GET request). Handled by `IncidentListView`.
+- `api/incidents/<int:pk>`: Retrieve a specific incident (GET request). Handled by `IncidentDetailView`.
+- `api/incidents/search`: Search for incidents based on specified parameters (GET request). Handled by `IncidentSearchView`.
 """
 
 
 from django.urls import path
-from .views import ThreatAnalyzeView, ThreatDetailView, ThreatSearchView
+from .views import (
+    IncidentDetailView,
+    IncidentListView,
+    IncidentSearchView,
+    ThreatAnalyzeView,
+    ThreatDetailView,
+    ThreatSearchView,
+)
 
 # URL configuration for the Threat Management API
 #
@@ -39,4 +49,16 @@ urlpatterns = [
     # Endpoint to search for threats (GET request).
     # This will be handled by the ThreatSearchView class.
     path('api/threats/search', ThreatSearchView.as_view(), name='threat-search'),
+
+    # Endpoint to list incidents, i.e. correlated groups of threats (GET request).
+    # This will be handled by the IncidentListView class.
+    path('api/incidents', IncidentListView.as_view(), name='incident-list'),
+
+    # Endpoint to retrieve a specific incident identified by its primary key (pk).
+    # This will be handled by the IncidentDetailView class.
+    path('api/incidents/<int:pk>', IncidentDetailView.as_view(), name='incident-detail'),
+
+    # Endpoint to search for incidents (GET request).
+    # This will be handled by the IncidentSearchView class.
+    path('api/incidents/search', IncidentSearchView.as_view(), name='incident-search'),
 ]
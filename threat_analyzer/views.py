@@ -1,15 +1,30 @@
-from threat_analyzer.models import Threat
-from datetime import datetime, timedelta
-from .serializers import ThreatSerializer
-import pandas as pd
+from threat_analyzer.models import Incident, Threat
+from threat_analyzer.detector_state import (
+    ACCOUNT_TAKEOVER_WINDOW,
+    CREDENTIAL_STUFFING_THRESHOLD,
+    DATA_EXFILTRATION_WINDOW,
+    PRIVILEGE_ESCALATION_WINDOW,
+    load_snapshots,
+    restore_trackers,
+    save_snapshots,
+    snapshot_trackers,
+)
+from datetime import timedelta
+from .serializers import IncidentSerializer, ThreatSerializer
+from .correlation import correlate_threats
+from log_ingestor.iputils import network_filter, range_filter
+from .profiling import NULL_PROFILER, profiler_for_request
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers, generics
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 import uuid
 import math
 
 
-def detect_threats(logs_df):
+def detect_threats(logs_df, state=None, profiler=None):
     """
     Detects potential threats from a given logs DataFrame.
 
@@ -23,64 +38,99 @@ def detect_threats(logs_df):
     Args:
         logs_df (pd.DataFrame): DataFrame containing log data with columns like 'user_id', 'ip_address', 'action',
                                  'file_name', 'database_query', and 'timestamp'.
+        state (dict, optional): Per-user tracker snapshots from a previous run (see `detector_state`).
+                                When given, tracking resumes from it and it is updated in place with
+                                the pruned snapshots of every user seen, so consecutive files can be
+                                analyzed incrementally.
+        profiler (PipelineProfiler, optional): Records the preparation and rule-loop stages and
+                                               the time spent in each rule (see `profiling`).
 
     Returns:
         List[Threat]: A list of `Threat` objects identified in the logs.
     """
+    import pandas as pd  # Imported on first analysis so the other endpoints start without pandas
+
     threats = []
-    logs_df["timestamp"] = pd.to_datetime(logs_df["timestamp"])  # Convert timestamps to datetime
-    logs_df["database_query"] = logs_df["database_query"].fillna("")  # Handle missing database queries
-    logs_df = logs_df.sort_values(by="timestamp")  # Sort logs by timestamp
+    profiler = profiler or NULL_PROFILER
+    tick = profiler.tick
+    timed = profiler.enabled  # Without a profiler the loop makes no tick calls at all
+
+    with profiler.stage("prepare_logs", rows=len(logs_df)):
+        logs_df["timestamp"] = pd.to_datetime(logs_df["timestamp"])  # Convert timestamps to datetime
+        logs_df["database_query"] = logs_df["database_query"].fillna("")  # Handle missing database queries
+        logs_df = logs_df.sort_values(by="timestamp", kind="stable")  # Sort logs by timestamp, keeping file order for ties
 
-    # Initialize tracking dictionaries for different threat scenarios
-    login_failures = {}
-    user_ip_timestamps = {}
-    file_access_tracker = {}
+    # Initialize tracking dictionaries for different threat scenarios, resuming from a previous run if given
+    login_failures, user_ip_timestamps, file_access_tracker = restore_trackers(
+        state or {}, logs_df["timestamp"].iloc[0] if not logs_df.empty else None)
 
     RESTRICTED_FILES = ["/secure/payroll.csv", "/confidential/design.pdf", "/db_dump.sql"]
     BUSINESS_HOURS_START = 5  # 5 AM
     BUSINESS_HOURS_END = 2  # 2 AM (next day)
 
     # Loop through each log row and analyze potential threats
-    for _, row in logs_df.iterrows():
-        user, ip, action, file_name, query, timestamp = row[
-            ["user_id", "ip_address", "action", "file_name", "database_query", "timestamp"]]
-
-        # Detect login failures
-        if action == "login_failed":
-            login_failures.setdefault(user, []).append(timestamp)
-
-        # Detect credential stuffing if 3 or more login failures precede a successful login
-        if action == "login_success" and user in login_failures and len(login_failures[user]) >= 3:
-            threats.append((timestamp, user, ip, action, file_name, "CredentialStuffing", "High"))
-            login_failures[user] = []  # Reset after threat detection
-
-        # Detect privilege escalation if a dangerous database query follows login failures
-        if action == "database_query" and any(op in query for op in ["INSERT", "DELETE"]):
-            if user in login_failures and any(
-                    timestamp - fail_time <= timedelta(minutes=5) for fail_time in login_failures[user]):
-                threats.append((timestamp, user, ip, action, file_name, "PrivilegeEscalation", "High"))
-
-        # Detect account takeover based on different IP access and restricted file access
-        if user in user_ip_timestamps and user_ip_timestamps[user][1] != ip and timestamp - user_ip_timestamps[user][
-            0] <= timedelta(minutes=10) and file_name in RESTRICTED_FILES:
-            threats.append((timestamp, user, ip, action, file_name, "AccountTakeover", "Critical"))
-        user_ip_timestamps[user] = (timestamp, ip)
-
-        # Detect data exfiltration based on multiple file accesses within 30 seconds
-        if file_name in RESTRICTED_FILES:
-            file_access_tracker.setdefault(user, []).append(timestamp)
-            file_access_tracker[user] = [t for t in file_access_tracker[user] if timestamp - t <= timedelta(seconds=30)]
-            if len(file_access_tracker[user]) > 3:
-                threats.append((timestamp, user, ip, action, file_name, "DataExfiltration", "Critical"))
-
-        # Detect insider threat based on file access during non-business hours
-        if action == "file_access" and (timestamp.hour < BUSINESS_HOURS_START or timestamp.hour >= BUSINESS_HOURS_END):
-            threats.append((timestamp, user, ip, action, file_name, "InsiderThreat", "Medium"))
+    with profiler.stage("rules", rows=len(logs_df)):
+        tick()
+        for _, row in logs_df.iterrows():
+            user, ip, action, file_name, query, timestamp = row[
+                ["user_id", "ip_address", "action", "file_name", "database_query", "timestamp"]]
+            if timed:
+                tick("row_access")
+
+            # Detect login failures
+            if action == "login_failed":
+                login_failures.setdefault(user, []).append(timestamp)
+
+            # Detect credential stuffing if 3 or more login failures precede a successful login
+            if action == "login_success" and user in login_failures and sum(
+                    fail_time <= timestamp for fail_time in login_failures[user]) >= CREDENTIAL_STUFFING_THRESHOLD:
+                threats.append((timestamp, user, ip, action, file_name, "CredentialStuffing", "High"))
+                login_failures[user] = [t for t in login_failures[user] if t > timestamp]  # Reset after threat detection
+            if timed:
+                tick("CredentialStuffing")
+
+            # Detect privilege escalation if a dangerous database query follows login failures
+            if action == "database_query" and any(op in query for op in ["INSERT", "DELETE"]):
+                if user in login_failures and any(timedelta(0) <= timestamp - fail_time <= PRIVILEGE_ESCALATION_WINDOW
+                                                  for fail_time in login_failures[user]):
+                    threats.append((timestamp, user, ip, action, file_name, "PrivilegeEscalation", "High"))
+            if timed:
+                tick("PrivilegeEscalation")
+
+            # Detect account takeover based on different IP access and restricted file access
+            # Restored state may be newer than this upload (older file analyzed late): ignore negative gaps
+            if user in user_ip_timestamps and user_ip_timestamps[user][1] != ip and timedelta(0) <= timestamp - user_ip_timestamps[
+                user][0] <= ACCOUNT_TAKEOVER_WINDOW and file_name in RESTRICTED_FILES:
+                threats.append((timestamp, user, ip, action, file_name, "AccountTakeover", "Critical"))
+            user_ip_timestamps[user] = (timestamp, ip)
+            if timed:
+                tick("AccountTakeover")
+
+            # Detect data exfiltration based on multiple file accesses within 30 seconds
+            if file_name in RESTRICTED_FILES:
+                file_access_tracker.setdefault(user, []).append(timestamp)
+                file_access_tracker[user] = [t for t in file_access_tracker[user]
+                                             if timedelta(0) <= timestamp - t <= DATA_EXFILTRATION_WINDOW]
+                if len(file_access_tracker[user]) > 3:
+                    threats.append((timestamp, user, ip, action, file_name, "DataExfiltration", "Critical"))
+            if timed:
+                tick("DataExfiltration")
+
+            # Detect insider threat based on file access during non-business hours
+            if action == "file_access" and (timestamp.hour < BUSINESS_HOURS_START or timestamp.hour >= BUSINESS_HOURS_END):
+                threats.append((timestamp, user, ip, action, file_name, "InsiderThreat", "Medium"))
+            if timed:
+                tick("InsiderThreat")
+
+    # Carry the pruned trackers over to the next run
+    if state is not None and not logs_df.empty:
+        state.update(snapshot_trackers(login_failures, user_ip_timestamps, file_access_tracker,
+                                       logs_df["timestamp"].iloc[-1]))
 
     # Convert detected threats into Threat model instances
-    return [Threat(timestamp=t[0], user_id=t[1], ip_address=t[2], action=t[3], file_name=t[4], threat_type=t[5],
-                   severity=t[6]) for t in threats]
+    with profiler.stage("build_threats", rows=len(threats)):
+        return [Threat(timestamp=t[0], user_id=t[1], ip_address=t[2], action=t[3], file_name=t[4],
+                       threat_type=t[5], severity=t[6]) for t in threats]
 
 
 def sanitize_value(value):
@@ -98,12 +148,45 @@ def sanitize_value(value):
     return value
 
 
+def int_query_param(params, name):
+    """
+    Reads an integer query parameter.
+
+    Args:
+        params: The request's query parameters.
+        name (str): Name of the parameter.
+
+    Returns:
+        int | None: The value, or None if the parameter is absent or empty.
+
+    Raises:
+        serializers.ValidationError: If the value is not an integer (400 response).
+    """
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise serializers.ValidationError({'error': f"{name} must be an integer"})
+
+
 class ThreatAnalyzeView(APIView):
     """
     View to analyze logs and detect potential threats.
 
     Accepts a CSV file containing logs, detects threats using the `detect_threats` function,
     and stores the detected threats in the database. Returns the detected threats in JSON format.
+
+    Detector state is restored before and persisted after each upload, so attacks spanning
+    consecutive files are detected. Pass `incremental=false` as a query parameter to analyze
+    the file in isolation without reading or updating the stored state.
+
+    When `ANOMALY_DETECTION_ENABLED` is set, the statistical engine in `anomaly_detection`
+    runs on the same file and its findings are stored and returned with the rule-based ones.
+
+    Detected threats are correlated into incidents (see `correlation`). Raw threats are stored
+    too unless `STORE_RAW_THREATS` is disabled.
     """
 
     def post(self, request):
@@ -116,36 +199,87 @@ class ThreatAnalyzeView(APIView):
         Returns:
             Response: A JSON response containing the detected threats and a status message.
         """
+        # pandas and the anomaly engine are only loaded once an analysis actually runs
+        import pandas as pd
+        from .anomaly_detection import AnomalyDetector, load_baselines, save_baselines
+
         # Retrieve the uploaded file
         file = request.FILES.get('file')
         if not file:
             return Response({'error': 'No file uploaded'}, status=400)
 
-        # Read CSV logs into a DataFrame and detect threats
-        logs_df = pd.read_csv(file)
-        threats = detect_threats(logs_df)
-
-        # Bulk create Threat objects in the database
-        Threat.objects.bulk_create(threats)
-
-        # Prepare the threats as a JSON response with unique UUIDs as keys
-        threats_json = {
-            str(uuid.uuid4()): {
-                "timestamp": threat.timestamp.isoformat(),
-                "user_id": sanitize_value(threat.user_id),
-                "ip_address": sanitize_value(threat.ip_address),
-                "action": sanitize_value(threat.action),
-                "file_name": sanitize_value(threat.file_name),
-                "threat_type": sanitize_value(threat.threat_type),
-                "severity": sanitize_value(threat.severity),
-            }
-            for threat in threats
-        }
+        incremental = request.query_params.get('incremental', 'true').lower() != 'false'
+        profiler = profiler_for_request(request)
+        if profiler.enabled:
+            profiler.start()
+
+        try:
+            # Read CSV logs into a DataFrame and detect threats, resuming from the stored detector state
+            with profiler.stage("read_csv") as stage:
+                # Read IDs and addresses as text so numeric user IDs match the string keys of the stored state
+                logs_df = pd.read_csv(file, dtype={'user_id': str, 'ip_address': str})
+                stage["rows"] = len(logs_df)
+            with profiler.stage("load_detector_state"):
+                state = load_snapshots(logs_df["user_id"].unique()) if incremental else None
+            threats = detect_threats(logs_df, state, profiler)
+
+            # Persist state, baselines, incidents and threats together: a failure part way
+            # must not leave state advanced past threats that were never stored
+            with transaction.atomic():
+                if state is not None:
+                    with profiler.stage("save_detector_state"):
+                        save_snapshots(state)
+
+                # Flag deviations from per-user baselines with the statistical engine
+                if getattr(settings, 'ANOMALY_DETECTION_ENABLED', False):
+                    with profiler.stage("anomaly_detection", rows=len(logs_df)):
+                        baselines = load_baselines(logs_df["user_id"].unique()) if incremental else {}
+                        detector = AnomalyDetector(baselines)
+                        threats += detector.observe_batch(logs_df)
+                        if incremental:
+                            save_baselines(detector.baselines)
+
+                # Merge threats into incidents, then bulk create Threat objects linked to them
+                with profiler.stage("correlate_threats", rows=len(threats)):
+                    incidents = correlate_threats(threats)
+                if getattr(settings, 'STORE_RAW_THREATS', True):
+                    with profiler.stage("bulk_create", rows=len(threats)):
+                        Threat.objects.bulk_create(threats)
+
+            # Prepare the threats as a JSON response with unique UUIDs as keys
+            with profiler.stage("build_response", rows=len(threats)):
+                threats_json = {
+                    str(uuid.uuid4()): {
+                        "timestamp": threat.timestamp.isoformat(),
+                        "user_id": sanitize_value(threat.user_id),
+                        "ip_address": sanitize_value(threat.ip_address),
+                        "action": sanitize_value(threat.action),
+                        "file_name": sanitize_value(threat.file_name),
+                        "threat_type": sanitize_value(threat.threat_type),
+                        "severity": sanitize_value(threat.severity),
+                    }
+                    for threat in threats
+                }
+                payload = {"message": "Threats detected", "Total no of Threats detected": len(threats_json),
+                           "Total no of Incidents updated": len(incidents), "threats": threats_json}
+
+            if profiler.enabled:
+                # The response is rendered after the view returns, so time an equivalent render here
+                with profiler.stage("render_json", rows=len(threats)):
+                    JSONRenderer().render(payload)
+        finally:
+            if profiler.enabled:
+                profiler.stop()
+
+        if profiler.enabled:
+            profiler.count_hits(threats)
+            directory = getattr(settings, 'ANALYZE_PROFILING_DIR', None)
+            if profiler.profile is not None and directory:
+                profiler.dump_stats(directory)
+            payload["profile"] = profiler.report()
 
         # Return the formatted JSON response
-        return Response(
-            {"message": "Threats detected", "Total no of Threats detected": len(threats_json), "threats": threats_json},
-            content_type="application/json")
+        return Response(payload, content_type="application/json")
 
 
 class ThreatListView(generics.ListAPIView):
@@ -172,7 +306,8 @@ class ThreatSearchView(generics.ListAPIView):
     """
     View to search for threats based on query parameters.
 
-    This view allows filtering threats by type, user, and time range.
+    This view allows filtering threats by type, user, time range, IP address
+    (`network` as a CIDR block, or an inclusive `ip_start`/`ip_end` range), and incident ID.
     """
     serializer_class = ThreatSerializer
 
@@ -191,6 +326,10 @@ class ThreatSearchView(generics.ListAPIView):
         user_id = self.request.query_params.get('user')
         start_time = self.request.query_params.get('start_time')
         end_time = self.request.query_params.get('end_time')
+        network = self.request.query_params.get('network')
+        ip_start = self.request.query_params.get('ip_start')
+        ip_end = self.request.query_params.get('ip_end')
+        incident = int_query_param(self.request.query_params, 'incident')
 
         # Apply filters based on query parameters
         if threat_type:
@@ -199,5 +338,80 @@ class ThreatSearchView(generics.ListAPIView):
             queryset = queryset.filter(user_id=user_id)
         if start_time and end_time:
             queryset = queryset.filter(timestamp__range=[start_time, end_time])
+        if incident is not None:
+            queryset = queryset.filter(incident_id=incident)
+        try:
+            if network:
+                queryset = queryset.filter(network_filter(network))
+            if ip_start or ip_end:
+                queryset = queryset.filter(range_filter(ip_start, ip_end))
+        except ValueError as exc:
+            raise serializers.ValidationError({'error': str(exc)})
+
+        return queryset
+
+
+class IncidentListView(generics.ListAPIView):
+    """
+    View to list all incidents, most recently active first.
+
+    Incidents group correlated threats, so this is a compact alternative to listing raw threats.
+    """
+    queryset = Incident.objects.order_by('-last_seen')
+    serializer_class = IncidentSerializer
+
+
+class IncidentDetailView(generics.RetrieveAPIView):
+    """
+    View to retrieve the details of a specific incident.
+    """
+    queryset = Incident.objects.all()
+    serializer_class = IncidentSerializer
+
+
+class IncidentSearchView(generics.ListAPIView):
+    """
+    View to search for incidents based on query parameters.
+
+    This view allows filtering incidents by type, user, severity, minimum number of grouped
+    threats, activity time range (incidents overlapping `start_time`..`end_time`), and IP
+    address (`network` as a CIDR block, or an inclusive `ip_start`/`ip_end` range).
+    """
+    serializer_class = IncidentSerializer
+
+    def get_queryset(self):
+        """
+        Filter the queryset based on search parameters.
+
+        Args:
+            self.request.query_params: The query parameters for filtering.
+
+        Returns:
+            queryset: The filtered list of `Incident` objects.
+        """
+        queryset = Incident.objects.order_by('-last_seen')
+        params = self.request.query_params
+
+        # Apply filters based on query parameters
+        if params.get('type'):
+            queryset = queryset.filter(threat_type=params['type'])
+        if params.get('user'):
+            queryset = queryset.filter(user_id=params['user'])
+        if params.get('severity'):
+            queryset = queryset.filter(severity=params['severity'])
+        min_count = int_query_param(params, 'min_count')
+        if min_count is not None:
+            queryset = queryset.filter(count__gte=min_count)
+        if params.get('start_time'):
+            queryset = queryset.filter(last_seen__gte=params['start_time'])
+        if params.get('end_time'):
+            queryset = queryset.filter(first_seen__lte=params['end_time'])
+        try:
+            if params.get('network'):
+                queryset = queryset.filter(network_filter(params['network']))
+            if params.get('ip_start') or params.get('ip_end'):
+                queryset = queryset.filter(range_filter(params.get('ip_start'), params.get('ip_end')))
+        except ValueError as exc:
+            raise serializers.ValidationError({'error': str(exc)})
 
         return queryset
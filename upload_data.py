@@ -1,4 +1,5 @@
 import csv
+import os
 import requests
 
 
@@ -12,7 +13,13 @@ def ingest_logs(file_path):
     Args:
         file_path (str): The path to the CSV file containing raw log data. The file should have headers
                          corresponding to the fields expected by the API.
+
+    If the INGEST_TOKEN environment variable is set (see `python manage.py issue_service_token`),
+    it is sent as a Bearer token so the server can authenticate without a per-request user lookup.
     """
+    token = os.environ.get('INGEST_TOKEN')
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+
     with open(file_path, 'r') as csvfile:
         # Use DictReader to read the CSV as a dictionary
         reader = csv.DictReader(csvfile)
@@ -20,7 +27,7 @@ def ingest_logs(file_path):
         # Loop through each row in the CSV
         for row in reader:
             # Send the log data as a POST request to the API endpoint
-            response = requests.post('http://localhost:8000/api/logs', json=row)
+            response = requests.post('http://localhost:8000/api/logs', json=row, headers=headers)
 
             # Print the status code and response from the API
             print(response.status_code, response.json())